@@ -0,0 +1,38 @@
+from typing import Dict, Any, Optional, Tuple
+
+from agents.planner import PlannerAgent
+from agents.interpreter import InterpreterAgent
+from utils.prompt_templates import get_combined_prompt
+
+class CombinedAgent(PlannerAgent):
+    """
+    Combined agent that plans the next steps and translates the first one into
+    a command in a single model call, replacing a planner + interpreter round-trip.
+    """
+    
+    def _get_prompt(self, context: str, attack_goal: str) -> Tuple[str, str]:
+        """Get the (system, user) prompt pair for a combined planning call"""
+        return get_combined_prompt(context, attack_goal)
+    
+    def _parse_response(self, content: str, context: str, attack_goal: str) -> Optional[Dict[str, Any]]:
+        """
+        Parse the raw model response into a plan with a sanitized first_command
+        
+        Args:
+            content: The raw model response
+            context: Current attack context
+            attack_goal: The goal of the attack
+            
+        Returns:
+            The parsed plan, or None if the response is unusable. first_command is
+            dropped if it is missing or empty, so the caller can fall back to the interpreter.
+        """
+        plan = super()._parse_response(content, context, attack_goal)
+        if plan is None:
+            return None
+        
+        command = plan.pop("first_command", None)
+        if isinstance(command, str) and command.strip():
+            plan["first_command"] = InterpreterAgent._parse_response(command)
+        
+        return plan
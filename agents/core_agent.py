@@ -1,15 +1,18 @@
 import json
 import time
+import asyncio
 from typing import Dict, Any, List, Optional
 from datetime import datetime
 
-from config.settings import USE_SUMMARIZER, MAX_ATTACK_STEPS
+from config.settings import USE_SUMMARIZER, USE_COMBINED_AGENT, MAX_ATTACK_STEPS, STEP_DELAY_SECONDS, CONTEXT_TOKEN_BUDGET, SUMMARIZER_TOKEN_THRESHOLD
 from utils.ssh_client import SSHClient
 from utils.context_manager import ContextManager
+from utils.io_executor import run_io
 from agents.planner import PlannerAgent
 from agents.interpreter import InterpreterAgent
 from agents.summarizer import SummarizerAgent
 from agents.extractor import ExtractorAgent
+from agents.combined_agent import CombinedAgent
 
 class CoreAgent:
     """
@@ -21,7 +24,9 @@ class CoreAgent:
         self.ssh_client = SSHClient()
         self.context_manager = ContextManager()
         
-        self.planner = PlannerAgent()
+        # The combined agent plans and emits the first command in one call; the
+        # interpreter remains the fallback when it returns no usable command
+        self.planner = CombinedAgent() if USE_COMBINED_AGENT else PlannerAgent()
         self.interpreter = InterpreterAgent()
         self.summarizer = SummarizerAgent() if USE_SUMMARIZER else None
         self.extractor = ExtractorAgent()
@@ -29,6 +34,7 @@ class CoreAgent:
         self.current_step = 0
         self.goal_reached = False
         self.attack_in_progress = False
+        self._prefetched = None
     
     def start_attack(self, goal: str) -> bool:
         """
@@ -48,6 +54,7 @@ class CoreAgent:
         self.current_step = 0
         self.goal_reached = False
         self.attack_in_progress = True
+        self._prefetched = None
         
         print(f"Starting attack with goal: {goal}")
         return True
@@ -59,6 +66,96 @@ class CoreAgent:
         Returns:
             Dictionary with step execution results
         """
+        status = self._check_step_allowed()
+        if status:
+            return status
+        
+        context_prefix, context = self.context_manager.get_full_context_cached()
+        
+        # Measured on the full history, since the cached context is already cut to MAX_CONTEXT_LENGTH
+        n_tokens = self.context_manager.count_context_tokens()
+        if self.summarizer and n_tokens > SUMMARIZER_TOKEN_THRESHOLD:
+            summary = self.summarizer.invoke(context_prefix + context)
+            context_prefix, context = "", self.context_manager.get_summarized_context(summary)
+        elif n_tokens > CONTEXT_TOKEN_BUDGET:
+            context_prefix, context = "", self.context_manager.get_windowed_context()
+        
+        plan = self.planner.invoke(context, self.context_manager.attack_goal, context_prefix)
+        first_command = plan.pop("first_command", None)
+        status = self._apply_plan(plan)
+        if status:
+            return status
+        
+        step = plan["steps"][0]
+        
+        prefetched = self._take_prefetched_command(step)
+        command = first_command or prefetched or self.interpreter.invoke(context, step, context_prefix, self.context_manager.attack_goal)
+        
+        output, error = self.ssh_client.execute_command(command)
+        
+        return self._record_step(step, command, output, error)
+    
+    async def aexecute_next_step(self) -> Dict[str, Any]:
+        """
+        Execute the next step in the attack, overlapping the SSH round-trip with
+        a speculative translation of the plan's following step
+        
+        Returns:
+            Dictionary with step execution results
+        """
+        status = self._check_step_allowed()
+        if status:
+            return status
+        
+        context_prefix, context = self.context_manager.get_full_context_cached()
+        
+        # Measured on the full history, since the cached context is already cut to MAX_CONTEXT_LENGTH
+        n_tokens = self.context_manager.count_context_tokens()
+        if self.summarizer and n_tokens > SUMMARIZER_TOKEN_THRESHOLD:
+            summary = await self.summarizer.ainvoke(context_prefix + context)
+            context_prefix, context = "", self.context_manager.get_summarized_context(summary)
+        elif n_tokens > CONTEXT_TOKEN_BUDGET:
+            context_prefix, context = "", self.context_manager.get_windowed_context()
+        
+        plan = await self.planner.ainvoke(context, self.context_manager.attack_goal, context_prefix)
+        first_command = plan.pop("first_command", None)
+        status = await run_io(self._apply_plan, plan)
+        if status:
+            return status
+        
+        step = plan["steps"][0]
+        
+        prefetched = self._take_prefetched_command(step)
+        command = first_command or prefetched or await self.interpreter.ainvoke(context, step, context_prefix, self.context_manager.attack_goal)
+        
+        ssh_task = asyncio.create_task(self.ssh_client.execute_command_async(command))
+        
+        # The next plan is likely to continue with the step after this one, so
+        # translate it while the command runs. It is only reused if it matches.
+        next_step = plan["steps"][1] if len(plan["steps"]) > 1 else None
+        if next_step:
+            prefetch_task = asyncio.create_task(self.interpreter.ainvoke(context, next_step, context_prefix, self.context_manager.attack_goal))
+            # A failed speculation must not cost the real command's output
+            ssh_result, next_command = await asyncio.gather(ssh_task, prefetch_task, return_exceptions=True)
+            if isinstance(ssh_result, BaseException):
+                raise ssh_result
+            output, error = ssh_result
+            if isinstance(next_command, BaseException):
+                print(f"Prefetching the command for the next step failed: {next_command}")
+            else:
+                self._prefetched = (next_step, next_command)
+        else:
+            output, error = await ssh_task
+        
+        return await run_io(self._record_step, step, command, output, error)
+    
+    def _check_step_allowed(self) -> Dict[str, Any]:
+        """
+        Check whether another step may be executed
+        
+        Returns:
+            A status dictionary if the attack cannot continue, an empty dict otherwise
+        """
         if not self.attack_in_progress:
             return {"error": "No attack in progress"}
         
@@ -69,13 +166,18 @@ class CoreAgent:
             self.attack_in_progress = False
             return {"message": "Maximum attack steps reached, attack terminated"}
         
-        context = self.context_manager.get_full_context()
-        
-        if self.summarizer and len(context) > 8000:
-            summary = self.summarizer.invoke(context)
-            context = self.context_manager.get_summarized_context(summary)
+        return {}
+    
+    def _apply_plan(self, plan: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Store the new plan and check whether it ends the attack
         
-        plan = self.planner.invoke(context, self.context_manager.attack_goal)
+        Args:
+            plan: The plan returned by the planner
+            
+        Returns:
+            A status dictionary if no command should be executed, an empty dict otherwise
+        """
         self.context_manager.set_current_plan(plan)
         
         if plan.get("goal_reached", False):
@@ -90,12 +192,36 @@ class CoreAgent:
         if not plan.get("steps"):
             return {"error": "No steps in the attack plan"}
         
-        step = plan["steps"][0]
-        
-        command = self.interpreter.invoke(context, step)
+        return {}
+    
+    def _take_prefetched_command(self, step: str) -> Optional[str]:
+        """
+        Consume the speculatively translated command if it was made for this step
         
-        output, error = self.ssh_client.execute_command(command)
+        Args:
+            step: The plan step about to be executed
+            
+        Returns:
+            The prefetched command, or None if there is no matching prefetch
+        """
+        prefetched, self._prefetched = self._prefetched, None
+        if prefetched and prefetched[0] == step:
+            return prefetched[1]
+        return None
+    
+    def _record_step(self, step: str, command: str, output: str, error: Optional[str]) -> Dict[str, Any]:
+        """
+        Store the result of an executed step in the attack context
         
+        Args:
+            step: The plan step that was executed
+            command: The executed command
+            output: Command output
+            error: Error message, if the command failed
+            
+        Returns:
+            Dictionary with step execution results
+        """
         if error:
             print(f"Error executing command: {error}")
             result = f"Error: {error}"
@@ -123,6 +249,15 @@ class CoreAgent:
         """
         Run the attack loop until the goal is reached or max steps is reached
         
+        Returns:
+            Dictionary with attack results
+        """
+        return asyncio.run(self.arun_attack_loop())
+    
+    async def arun_attack_loop(self) -> Dict[str, Any]:
+        """
+        Asynchronous attack loop used by run_attack_loop
+        
         Returns:
             Dictionary with attack results
         """
@@ -133,18 +268,23 @@ class CoreAgent:
         steps_executed = 0
         
         while not self.goal_reached and self.current_step < MAX_ATTACK_STEPS:
-            step_result = self.execute_next_step()
+            step_result = await self.aexecute_next_step()
             steps_executed += 1
             
             print(f"Step {self.current_step}: {step_result.get('command', 'N/A')}")
             
-            time.sleep(1)
+            if not self.attack_in_progress:
+                break
+            
+            # Yield to the event loop; steps are gated on awaited results, not on a fixed sleep
+            await asyncio.sleep(STEP_DELAY_SECONDS)
         
-        context = self.context_manager.get_full_context()
-        findings = self.extractor.invoke(context)
+        chunks = self.context_manager.get_context_chunks()
+        findings_list = await run_io(self.extractor.invoke_batch, chunks)
+        findings = self.extractor.merge_findings(findings_list)
         
-        for vuln in findings.get("vulnerabilities", []):
-            self.context_manager.add_vulnerability(vuln)
+        self.context_manager.add_vulnerabilities_bulk(findings.get("vulnerabilities", []))
+        await run_io(self.context_manager.flush)
         
         elapsed_time = time.time() - start_time
         
@@ -169,6 +309,7 @@ class CoreAgent:
         self.attack_in_progress = False
         
         self.ssh_client.close()
+        self.context_manager.flush()
         
         return {
             "message": "Attack stopped",
@@ -1,9 +1,11 @@
-import json
-from typing import Dict, Any, List
-from langchain.schema import HumanMessage
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List, Optional
 
+from config.settings import EXTRACTOR_MAX_WORKERS
 from models.model_loader import get_extractor_model
-from utils.prompt_templates import get_extractor_prompt
+from utils.prompt_templates import get_extractor_prompt, build_messages, VULNERABILITY_REQUIRED_FIELDS
+from utils.json_extract import extract_json
+from utils.response_cache import ResponseCache
 
 class ExtractorAgent:
     """
@@ -13,6 +15,7 @@ class ExtractorAgent:
     
     def __init__(self):
         self.model = get_extractor_model()
+        self._cache = ResponseCache()
         
     def invoke(self, context: str) -> Dict[str, Any]:
         """
@@ -24,36 +27,124 @@ class ExtractorAgent:
         Returns:
             Dictionary containing identified vulnerabilities and remediation suggestions
         """
-        prompt = get_extractor_prompt(context)
+        key = ResponseCache.make_key(context)
+        findings = self._cache.get(key)
+        if findings is not None:
+            return findings
         
-        response = self.model.invoke([HumanMessage(content=prompt)])
+        messages = build_messages(*get_extractor_prompt(context))
         
-        try:
-            # Try to extract JSON from various formats
-            content = response.content
-            
-            # If the response is surrounded by triple backticks, extract the JSON
-            if "```json" in content:
-                content = content.split("```json")[1].split("```")[0].strip()
-            elif "```" in content:
-                content = content.split("```")[1].strip()
-                
-            # Parse the JSON content
-            findings = json.loads(content)
+        response = self.model.invoke(messages)
+        
+        findings = self._parse_response(response.content)
+        if findings is None:
+            return self._default_findings()
+        
+        self._cache.put(key, findings)
+        return findings
+    
+    async def ainvoke(self, context: str) -> Dict[str, Any]:
+        """
+        Asynchronous variant of invoke, awaiting the model without blocking the event loop
+        
+        Args:
+            context: The full attack context
             
-            # Validate the structure
-            if not self._validate_findings(findings):
-                raise ValueError("Invalid findings structure")
-                
+        Returns:
+            Dictionary containing identified vulnerabilities and remediation suggestions
+        """
+        key = ResponseCache.make_key(context)
+        findings = self._cache.get(key)
+        if findings is not None:
             return findings
+        
+        messages = build_messages(*get_extractor_prompt(context))
+        
+        response = await self.model.ainvoke(messages)
+        
+        findings = self._parse_response(response.content)
+        if findings is None:
+            return self._default_findings()
+        
+        self._cache.put(key, findings)
+        return findings
+    
+    def invoke_batch(self, contexts: List[str]) -> List[Dict[str, Any]]:
+        """
+        Extract findings from several contexts concurrently
+        
+        The calls are I/O-bound HTTP requests, so threads overlap their waits.
+        
+        Args:
+            contexts: Attack context chunks to analyze
             
-        except (json.JSONDecodeError, ValueError) as e:
-            # If JSON parsing fails, return a simple default structure
-            print(f"Error parsing extractor response: {str(e)}")
-            return {
-                "vulnerabilities": [],
-                "summary": "Unable to extract vulnerabilities from the provided context."
-            }
+        Returns:
+            List of findings dictionaries, in the same order as contexts
+        """
+        if len(contexts) <= 1:
+            return [self.invoke(context) for context in contexts]
+        
+        with ThreadPoolExecutor(max_workers=min(len(contexts), EXTRACTOR_MAX_WORKERS)) as executor:
+            return list(executor.map(self.invoke, contexts))
+    
+    @staticmethod
+    def merge_findings(findings_list: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Merge findings from several chunks, dropping duplicate vulnerabilities
+        
+        Args:
+            findings_list: Findings dictionaries returned by invoke_batch
+            
+        Returns:
+            A single findings dictionary
+        """
+        if len(findings_list) == 1:
+            return findings_list[0]
+        
+        vulnerabilities = []
+        seen = set()
+        for findings in findings_list:
+            for vuln in findings.get("vulnerabilities", []):
+                key = (str(vuln.get("type")), str(vuln.get("evidence")))
+                if key not in seen:
+                    seen.add(key)
+                    vulnerabilities.append(vuln)
+        
+        summary = "\n\n".join(findings["summary"] for findings in findings_list if findings.get("summary"))
+        
+        return {
+            "vulnerabilities": vulnerabilities,
+            "summary": summary
+        }
+    
+    def _parse_response(self, content: str) -> Optional[Dict[str, Any]]:
+        """
+        Parse the raw model response into findings
+        
+        Args:
+            content: The raw model response
+            
+        Returns:
+            The parsed findings, or None if the response is unusable
+        """
+        findings = extract_json(content)
+        
+        if findings is None:
+            print("Error parsing extractor response: No JSON object found")
+            return None
+        
+        if not self._validate_findings(findings):
+            print("Error parsing extractor response: Invalid findings structure")
+            return None
+        
+        return findings
+    
+    def _default_findings(self) -> Dict[str, Any]:
+        """Simple default structure used when the model response cannot be parsed"""
+        return {
+            "vulnerabilities": [],
+            "summary": "Unable to extract vulnerabilities from the provided context."
+        }
     
     def _validate_findings(self, findings: Dict[str, Any]) -> bool:
         """
@@ -72,8 +163,7 @@ class ExtractorAgent:
             return False
         
         for vuln in findings["vulnerabilities"]:
-            required_fields = ["type", "description", "evidence", "severity", "remediation"]
-            if not all(field in vuln for field in required_fields):
+            if not all(field in vuln for field in VULNERABILITY_REQUIRED_FIELDS):
                 return False
         
         return True
\ No newline at end of file
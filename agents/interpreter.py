@@ -1,8 +1,24 @@
-from typing import Dict, Any
-from langchain.schema import HumanMessage
+import re
+from typing import Dict, Any, Optional
 
+from config.settings import INTERPRETER_CACHE_SIZE
 from models.model_loader import get_interpreter_model
-from utils.prompt_templates import get_interpreter_prompt
+from utils.prompt_templates import get_interpreter_prompt, build_messages
+from utils.response_cache import ResponseCache
+
+DANGEROUS_COMMANDS = [
+    "rm -rf /", 
+    "rm -rf /*", 
+    "> /dev/sda",
+    "mkfs",
+    "dd if=/dev/zero"
+]
+
+# Single alternation over all dangerous substrings, so a command is scanned once
+DANGEROUS_COMMAND_RE = re.compile("|".join(re.escape(dangerous) for dangerous in DANGEROUS_COMMANDS))
+
+# Steps naming a specific address are target-specific and never served from the cache
+IP_ADDRESS_RE = re.compile(r"\b\d+\.\d+\.\d+\.\d+\b")
 
 class InterpreterAgent:
     """
@@ -11,34 +27,104 @@ class InterpreterAgent:
     
     def __init__(self):
         self.model = get_interpreter_model()
+        self._cache = ResponseCache(INTERPRETER_CACHE_SIZE)
         
-    def invoke(self, context: str, step: str) -> str:
+    def invoke(self, context: str, step: str, context_prefix: str = "", goal: str = "") -> str:
         """
         Convert a plan step into an executable Linux command
         
         Args:
             context: Current attack context
             step: The plan step to convert to a command
+            context_prefix: Optional stable part of the context that precedes `context`
+            goal: The attack goal; with INTERPRETER_CACHE_SIZE set, the command for
+                a step already interpreted for this goal is reused
+            
+        Returns:
+            Executable Linux shell command
+        """
+        key = self._cache_key(step, goal)
+        if key is not None:
+            command = self._cache.get(key)
+            if command is not None:
+                return command
+        
+        messages = build_messages(*get_interpreter_prompt(context, step), context_prefix)
+        
+        response = self.model.invoke(messages)
+        
+        command = self._parse_response(response.content)
+        if key is not None:
+            self._cache.put(key, command)
+        return command
+    
+    async def ainvoke(self, context: str, step: str, context_prefix: str = "", goal: str = "") -> str:
+        """
+        Asynchronous variant of invoke, awaiting the model without blocking the event loop
+        
+        Args:
+            context: Current attack context
+            step: The plan step to convert to a command
+            context_prefix: Optional stable part of the context that precedes `context`
+            goal: The attack goal, used as part of the command cache key
             
         Returns:
             Executable Linux shell command
         """
-        prompt = get_interpreter_prompt(context, step)
+        key = self._cache_key(step, goal)
+        if key is not None:
+            command = self._cache.get(key)
+            if command is not None:
+                return command
         
-        response = self.model.invoke([HumanMessage(content=prompt)])
+        messages = build_messages(*get_interpreter_prompt(context, step), context_prefix)
         
-        command = response.content.strip()
+        response = await self.model.ainvoke(messages)
+        
+        command = self._parse_response(response.content)
+        if key is not None:
+            self._cache.put(key, command)
+        return command
+    
+    def _cache_key(self, step: str, goal: str) -> Optional[bytes]:
+        """
+        Build the command cache key for a step
+        
+        Args:
+            step: The plan step
+            goal: The attack goal
+            
+        Returns:
+            The key, or None if the cache is disabled or the step is target-specific
+        """
+        if self._cache.maxsize <= 0 or not goal or IP_ADDRESS_RE.search(step):
+            return None
+        return ResponseCache.make_key(" ".join(step.lower().split()), goal)
+    
+    @staticmethod
+    def _parse_response(content: str) -> str:
+        """
+        Turn the raw model response into a single sanitized command
+        
+        Args:
+            content: The raw model response
+            
+        Returns:
+            Executable Linux shell command
+        """
+        command = content.strip()
         
         if command.startswith("```") and command.endswith("```"):
             command = command.split("```")[1].strip()
         
         command = command.strip('"\'')
         
-        command = self._sanitize_command(command)
+        command = InterpreterAgent._sanitize_command(command)
         
         return command
     
-    def _sanitize_command(self, command: str) -> str:
+    @staticmethod
+    def _sanitize_command(command: str) -> str:
         """
         Sanitize and validate the generated command
         
@@ -55,16 +141,7 @@ class InterpreterAgent:
         if command.startswith("$ "):
             command = command[2:]
         
-        dangerous_commands = [
-            "rm -rf /", 
-            "rm -rf /*", 
-            "> /dev/sda",
-            "mkfs",
-            "dd if=/dev/zero"
-        ]
-        
-        for dangerous in dangerous_commands:
-            if dangerous in command:
-                return "echo 'Command blocked for safety reasons'"
+        if DANGEROUS_COMMAND_RE.search(command):
+            return "echo 'Command blocked for safety reasons'"
         
         return command
\ No newline at end of file
@@ -1,10 +1,12 @@
-import json
 import socket
-from typing import Dict, Any, List
-from langchain.schema import HumanMessage
-from config.settings import SSH_HOST  # Import SSH_HOST
+import time
+from typing import Dict, Any, List, Optional, Tuple
+from config.settings import SSH_HOST, DNS_CACHE_TTL, PLAN_CACHE_ENABLED
 from models.model_loader import get_planner_model
-from utils.prompt_templates import get_planner_prompt
+from utils.prompt_templates import get_planner_prompt, build_messages, PLANNER_REQUIRED_KEYS
+from utils.json_extract import extract_json
+from utils.response_cache import ResponseCache
+from utils.plan_cache import get_plan_cache
 
 class PlannerAgent:
     """
@@ -14,65 +16,168 @@ class PlannerAgent:
     
     def __init__(self):
         self.model = get_planner_model()
+        self._cache = ResponseCache()
+        # Plans from earlier runs, consulted after the in-memory cache
+        self._plan_cache = get_plan_cache() if PLAN_CACHE_ENABLED else None
+        self._resolved_at = None
+        self._check_target()
         
-    def invoke(self, context: str, attack_goal: str) -> Dict[str, Any]:
+    def invoke(self, context: str, attack_goal: str, context_prefix: str = "") -> Dict[str, Any]:
         """
         Generate an attack plan based on the current context and goal
         
         Args:
             context: Current attack context
             attack_goal: The goal of the attack
+            context_prefix: Optional stable part of the context that precedes `context`
             
         Returns:
             Dictionary containing the generated plan with steps, verification, and goal status
         """
+        fallback = self._check_target()
+        if fallback:
+            return fallback
+        
+        key = ResponseCache.make_key(attack_goal, context_prefix, context)
+        plan = self._lookup(key, attack_goal, context_prefix + context)
+        if plan is not None:
+            return plan
+        
+        messages = build_messages(*self._get_prompt(context, attack_goal), context_prefix)
+        
+        response = self.model.invoke(messages)
+        
+        plan = self._parse_response(response.content, context_prefix + context, attack_goal)
+        if plan is None:
+            return self._default_plan()
+        
+        self._store(key, attack_goal, context_prefix + context, plan)
+        return plan
+    
+    async def ainvoke(self, context: str, attack_goal: str, context_prefix: str = "") -> Dict[str, Any]:
+        """
+        Asynchronous variant of invoke, awaiting the model without blocking the event loop
+        
+        Args:
+            context: Current attack context
+            attack_goal: The goal of the attack
+            context_prefix: Optional stable part of the context that precedes `context`
+            
+        Returns:
+            Dictionary containing the generated plan with steps, verification, and goal status
+        """
+        fallback = self._check_target()
+        if fallback:
+            return fallback
+        
+        key = ResponseCache.make_key(attack_goal, context_prefix, context)
+        plan = self._lookup(key, attack_goal, context_prefix + context)
+        if plan is not None:
+            return plan
+        
+        messages = build_messages(*self._get_prompt(context, attack_goal), context_prefix)
+        
+        response = await self.model.ainvoke(messages)
+        
+        plan = self._parse_response(response.content, context_prefix + context, attack_goal)
+        if plan is None:
+            return self._default_plan()
+        
+        self._store(key, attack_goal, context_prefix + context, plan)
+        return plan
+    
+    def _lookup(self, key: bytes, attack_goal: str, context: str) -> Optional[Dict[str, Any]]:
+        """
+        Look up a plan in the in-memory cache, then in the persistent plan cache
+        
+        Args:
+            key: In-memory cache key built with ResponseCache.make_key
+            attack_goal: The goal of the attack
+            context: Full attack context
+            
+        Returns:
+            The cached plan, or None on a miss
+        """
+        plan = self._cache.get(key)
+        if plan is None and self._plan_cache is not None:
+            plan = self._plan_cache.get(type(self).__name__, attack_goal, context)
+            if plan is not None:
+                self._cache.put(key, plan)
+        return plan
+    
+    def _store(self, key: bytes, attack_goal: str, context: str, plan: Dict[str, Any]) -> None:
+        """Store a freshly generated plan in the in-memory and persistent caches"""
+        self._cache.put(key, plan)
+        if self._plan_cache is not None:
+            self._plan_cache.put(type(self).__name__, attack_goal, context, plan)
+    
+    def _get_prompt(self, context: str, attack_goal: str) -> Tuple[str, str]:
+        """Get the (system, user) prompt pair for a planning call"""
+        return get_planner_prompt(context, attack_goal)
+    
+    def _check_target(self) -> Dict[str, Any]:
+        """
+        Make sure the target host resolves before spending a model call.
+        A successful lookup is reused for DNS_CACHE_TTL seconds.
+        
+        Returns:
+            A fallback plan if the host cannot be resolved, an empty dict otherwise
+        """
+        now = time.monotonic()
+        if self._resolved_at is not None and now - self._resolved_at < DNS_CACHE_TTL:
+            return {}
+        
         try:
-            socket.gethostbyname(SSH_HOST)
+            socket.getaddrinfo(SSH_HOST, None)
+            self._resolved_at = now
         except socket.gaierror:
+            self._resolved_at = None
             print(f"Error: Cannot resolve {SSH_HOST}")
             return {
                 "steps": [f"ping -c 4 {SSH_HOST}"],
                 "goal_verification": "Check if ping responds",
                 "goal_reached": False
             }
+        return {}
+    
+    def _parse_response(self, content: str, context: str, attack_goal: str) -> Optional[Dict[str, Any]]:
+        """
+        Parse the raw model response into a plan
         
-        prompt = get_planner_prompt(context, attack_goal)
+        Args:
+            content: The raw model response
+            context: Current attack context
+            attack_goal: The goal of the attack
+            
+        Returns:
+            The parsed plan, or None if the response is unusable
+        """
+        plan = extract_json(content)
         
-        response = self.model.invoke([HumanMessage(content=prompt)])
+        if plan is None:
+            print("Error parsing planner response: No JSON object found")
+            return None
         
-        try:
-            # Try to extract JSON from various formats
-            content = response.content
-            
-            # If the response is surrounded by triple backticks, extract the JSON
-            if "```json" in content:
-                content = content.split("```json")[1].split("```")[0].strip()
-            elif "```" in content:
-                content = content.split("```")[1].strip()
-                
-            # Parse the JSON content
-            plan = json.loads(content)
-            
-            # Check for goal completion
-            if "Identify all open ports" in attack_goal:
-                if "Nmap done" in context and "open" in context.lower() and "version" in context.lower():
-                    plan["goal_reached"] = True
-            
-            # Validate the structure
-            if not self._validate_plan(plan):
-                raise ValueError("Invalid plan structure")
-                
-            print(f"Generated Plan: {plan}")
-            return plan
-            
-        except (json.JSONDecodeError, ValueError) as e:
-            # If JSON parsing fails, return a simple default plan
-            print(f"Error parsing planner response: {str(e)}")
-            return {
-                "steps": [f"nmap -sS -sV --top-ports 1000 {SSH_HOST}"],
-                "goal_verification": "Check for open ports and service versions",
-                "goal_reached": False
-            }
+        # Check for goal completion
+        if "Identify all open ports" in attack_goal:
+            if "Nmap done" in context and "open" in context.lower() and "version" in context.lower():
+                plan["goal_reached"] = True
+        
+        # Validate the structure
+        if not self._validate_plan(plan):
+            print("Error parsing planner response: Invalid plan structure")
+            return None
+        
+        print(f"Generated Plan: {plan}")
+        return plan
+    
+    def _default_plan(self) -> Dict[str, Any]:
+        """Simple default plan used when the model response cannot be parsed"""
+        return {
+            "steps": [f"nmap -sS -sV --top-ports 1000 {SSH_HOST}"],
+            "goal_verification": "Check for open ports and service versions",
+            "goal_reached": False
+        }
     
     def _validate_plan(self, plan: Dict[str, Any]) -> bool:
         """
@@ -84,9 +189,7 @@ class PlannerAgent:
         Returns:
             True if the plan is valid, False otherwise
         """
-        required_keys = ["steps", "goal_verification", "goal_reached"]
-        
-        if not all(key in plan for key in required_keys):
+        if not all(key in plan for key in PLANNER_REQUIRED_KEYS):
             return False
             
         if not isinstance(plan["steps"], list):
@@ -98,4 +201,4 @@ class PlannerAgent:
         if not isinstance(plan["goal_verification"], str):
             return False
             
-        return True
\ No newline at end of file
+        return True
@@ -1,8 +1,7 @@
 from typing import Dict, Any
-from langchain.schema import HumanMessage
 
 from models.model_loader import get_summarizer_model
-from utils.prompt_templates import get_summarizer_prompt
+from utils.prompt_templates import get_summarizer_prompt, build_messages
 
 class SummarizerAgent:
     """
@@ -22,10 +21,26 @@ class SummarizerAgent:
         Returns:
             Summarized attack context
         """
-        prompt = get_summarizer_prompt(context)
+        messages = build_messages(*get_summarizer_prompt(context))
         
-        response = self.model.invoke([HumanMessage(content=prompt)])
+        response = self.model.invoke(messages)
         
         summary = response.content.strip()
         
-        return summary
\ No newline at end of file
+        return summary
+    
+    async def ainvoke(self, context: str) -> str:
+        """
+        Asynchronous variant of invoke, awaiting the model without blocking the event loop
+        
+        Args:
+            context: Full attack context to summarize
+            
+        Returns:
+            Summarized attack context
+        """
+        messages = build_messages(*get_summarizer_prompt(context))
+        
+        response = await self.model.ainvoke(messages)
+        
+        return response.content.strip()
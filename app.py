@@ -1,6 +1,8 @@
 import streamlit as st
 import requests
+from requests.adapters import HTTPAdapter
 import json
+import orjson
 import time
 import datetime
 from pathlib import Path
@@ -9,15 +11,31 @@ import io
 # FastAPI backend URL
 BACKEND_URL = "http://localhost:8000"
 
+def get_session():
+    """
+    Get this user's HTTP session to the backend.
+    Kept per Streamlit session so the Authorization header is never shared between users,
+    and reused across reruns so connections to the backend stay alive.
+    """
+    if "http_session" not in st.session_state:
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=10, pool_maxsize=10)
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        st.session_state["http_session"] = session
+    return st.session_state["http_session"]
+
 def login():
     """Handle user authentication"""
     st.title("Security Testing Agent - Login")
     username = st.text_input("Username")
     password = st.text_input("Password", type="password")
     if st.button("Login"):
-        response = requests.post(f"{BACKEND_URL}/login", json={"username": username, "password": password})
+        session = get_session()
+        response = session.post(f"{BACKEND_URL}/login", json={"username": username, "password": password})
         if response.status_code == 200:
             st.session_state["token"] = response.json()["access_token"]
+            session.headers.update({"Authorization": f"Bearer {st.session_state['token']}"})
             st.success("Logged in successfully!")
             st.rerun()
         else:
@@ -30,16 +48,14 @@ def run_goal_based_test(goal, verbose, max_steps):
         "verbose": verbose,
         "max_steps": max_steps
     }
-    headers = {"Authorization": f"Bearer {st.session_state['token']}"}
-    response = requests.post(f"{BACKEND_URL}/run-goal", json=payload, headers=headers)
+    response = get_session().post(f"{BACKEND_URL}/run-goal", json=payload)
     return response.json()
 
 def run_task_based_test(config_file, task_id, verbose):
     """Run a task-based test via the FastAPI backend"""
     files = {"file": config_file}
     payload = {"task_id": task_id, "verbose": verbose}
-    headers = {"Authorization": f"Bearer {st.session_state['token']}"}
-    response = requests.post(f"{BACKEND_URL}/run-task", files=files, data=payload, headers=headers)
+    response = get_session().post(f"{BACKEND_URL}/run-task", files=files, data=payload)
     return response.json()
 
 def create_pdf_report(result, test_type, test_name):
@@ -80,8 +96,7 @@ Status: {'Successful' if result.get('success', False) else 'Failed'}
 def get_predefined_goals():
     """Fetch predefined attack goals from the backend"""
     try:
-        headers = {"Authorization": f"Bearer {st.session_state['token']}"}
-        response = requests.get(f"{BACKEND_URL}/attack-goals", headers=headers)
+        response = get_session().get(f"{BACKEND_URL}/attack-goals")
         if response.status_code == 200:
             return response.json().get("goals", [])
         return []
@@ -140,7 +155,7 @@ def main_dashboard():
         if config_file:
             try:
                 config_file.seek(0)
-                config_data = json.load(config_file)
+                config_data = orjson.loads(config_file.read())
                 config_file.seek(0)  # Reset file position for later use
                 
                 # Extract task IDs from the config
@@ -194,18 +209,22 @@ def main_dashboard():
         
         # List available reports from the backend
         try:
-            headers = {"Authorization": f"Bearer {st.session_state['token']}"}
-            response = requests.get(f"{BACKEND_URL}/reports", headers=headers)
+            session = get_session()
+            response = session.get(f"{BACKEND_URL}/reports")
             reports = response.json().get("reports", [])
             if reports:
                 st.subheader("Available Reports")
                 st.dataframe(reports)
                 report_id = st.selectbox("Select Report to Download", [r["id"] for r in reports])
                 if st.button("Download Selected Report"):
-                    response = requests.get(f"{BACKEND_URL}/report/{report_id}/pdf", headers=headers)
+                    # Stream the PDF in 1 MiB chunks instead of buffering the whole body in requests
+                    pdf_data = io.BytesIO()
+                    with session.get(f"{BACKEND_URL}/report/{report_id}/pdf", stream=True) as response:
+                        for chunk in response.iter_content(chunk_size=1 << 20):
+                            pdf_data.write(chunk)
                     st.download_button(
                         label="Download PDF",
-                        data=response.content,
+                        data=pdf_data.getvalue(),
                         file_name=f"report_{report_id}.pdf",
                         mime="application/pdf"
                     )
@@ -0,0 +1,33 @@
+"""
+Authentication
+
+Shared bearer-token dependency for the FastAPI backend.
+"""
+
+import hashlib
+
+from fastapi import Depends, HTTPException
+from fastapi.security import OAuth2PasswordBearer
+from cachetools import TTLCache
+
+oauth2_scheme = OAuth2PasswordBearer(tokenUrl="login")
+
+# Recently validated tokens, keyed by a digest so raw tokens are not kept as keys
+token_cache = TTLCache(maxsize=10000, ttl=30)
+
+def _token_key(token: str) -> str:
+    return hashlib.sha256(token.encode()).hexdigest()[:32]
+
+def verify_token(token: str) -> bool:
+    """Validate a bearer token"""
+    return token == "valid-token"  # Replace with actual token validation
+
+# Dummy authentication (replace with proper auth)
+async def get_current_user(token: str = Depends(oauth2_scheme)):
+    key = _token_key(token)
+    if key in token_cache:
+        return token_cache[key]
+    if not verify_token(token):
+        raise HTTPException(status_code=401, detail="Invalid token")
+    token_cache[key] = token
+    return token
@@ -1,26 +1,115 @@
 from fastapi import FastAPI, UploadFile, File, HTTPException, Depends, BackgroundTasks
-from fastapi.security import OAuth2PasswordBearer
-from fastapi.responses import FileResponse, Response
-import subprocess
-import json
+from fastapi.responses import FileResponse, Response, ORJSONResponse
+from fastapi.middleware.gzip import GZipMiddleware
+import asyncio
+import atexit
+import orjson
 import os
+import shutil
 import tempfile
+import threading
 import datetime
-from typing import Optional
+import traceback
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from contextlib import redirect_stdout, redirect_stderr
+from string import Template
+from typing import Optional, List, Dict, Any, Tuple
 import io
 import markdown
 import pdfkit  # You'll need to install this: pip install pdfkit (requires wkhtmltopdf)
+try:
+    from weasyprint import HTML as WeasyHTML  # Preferred in-process PDF renderer
+except (ImportError, OSError):
+    WeasyHTML = None
 import sys
+import aiofiles
 
+# Make the project modules importable regardless of the working directory, once
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+if BASE_DIR not in sys.path:
+    sys.path.insert(0, BASE_DIR)
 
-app = FastAPI()
-oauth2_scheme = OAuth2PasswordBearer(tokenUrl="login")
+import main as cli
+from auth import get_current_user
+from config.settings import BACKEND_EXECUTION_MODE, BACKEND_POOL_WORKERS, DEFAULT_ATTACK_GOALS
 
-# Dummy authentication (replace with proper auth)
-async def get_current_user(token: str = Depends(oauth2_scheme)):
-    if token != "valid-token":  # Replace with actual token validation
-        raise HTTPException(status_code=401, detail="Invalid token")
-    return token
+
+class JSONGZipMiddleware(GZipMiddleware):
+    """Gzip responses except PDF downloads, which are already compressed"""
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and scope["path"].endswith("/pdf"):
+            await self.app(scope, receive, send)
+            return
+        await super().__call__(scope, receive, send)
+
+app = FastAPI(default_response_class=ORJSONResponse)
+app.add_middleware(JSONGZipMiddleware, minimum_size=1024, compresslevel=5)
+
+# In-process runs redirect the process-wide stdout/stderr and share the attack
+# context file, so they are executed one at a time off the event loop
+cli_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="attack-run")
+
+# Persistent worker processes for the "process_pool" execution mode, created on first use
+process_pool = None
+
+def _preimport():
+    """Load the heavy agent and workflow modules once per pool worker"""
+    import agents.core_agent
+    import workflows.attack_workflow
+
+def _get_process_pool() -> ProcessPoolExecutor:
+    global process_pool
+    if process_pool is None:
+        process_pool = ProcessPoolExecutor(max_workers=BACKEND_POOL_WORKERS, initializer=_preimport)
+        atexit.register(process_pool.shutdown)
+    return process_pool
+
+def _run_cli_captured(argv: List[str]) -> Dict[str, Any]:
+    """Run main.py's CLI in this process, capturing what it prints"""
+    stdout, stderr = io.StringIO(), io.StringIO()
+    with redirect_stdout(stdout), redirect_stderr(stderr):
+        try:
+            returncode = cli.run_cli(cli.parse_arguments(argv))
+        except SystemExit as e:
+            returncode = e.code if isinstance(e.code, int) else 1
+        except Exception:
+            traceback.print_exc()
+            returncode = 1
+    return {"returncode": returncode, "stdout": stdout.getvalue(), "stderr": stderr.getvalue()}
+
+async def _run_cli_subprocess(argv: List[str]) -> Dict[str, Any]:
+    """Run main.py as a child process, awaiting it without blocking the event loop"""
+    proc = await asyncio.create_subprocess_exec(
+        sys.executable, os.path.join(os.path.dirname(__file__), "main.py"), *argv,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE
+    )
+    stdout, stderr = await proc.communicate()
+    return {
+        "returncode": proc.returncode,
+        "stdout": stdout.decode("utf-8", errors="replace"),
+        "stderr": stderr.decode("utf-8", errors="replace")
+    }
+
+async def run_cli(argv: List[str]) -> Dict[str, Any]:
+    """
+    Run main.py with the given arguments without blocking the event loop,
+    in-process, as a subprocess or on the worker pool depending on BACKEND_EXECUTION_MODE
+    
+    Returns:
+        Dictionary with the returncode, stdout and stderr of the run
+    """
+    if BACKEND_EXECUTION_MODE == "subprocess":
+        return await _run_cli_subprocess(argv)
+    if BACKEND_EXECUTION_MODE == "process_pool":
+        # Each worker has its own stdout, so runs can proceed in parallel
+        return await asyncio.wrap_future(_get_process_pool().submit(_run_cli_captured, argv))
+    
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(cli_executor, _run_cli_captured, argv)
+
+UPLOAD_CHUNK_SIZE = 8 * 1024 * 1024  # 8 MiB
 
 @app.post("/login")
 async def login(credentials: dict):
@@ -34,8 +123,15 @@ def cleanup_temp_file(file_path: str):
     if os.path.exists(file_path):
         os.remove(file_path)
 
+def save_report(report_id: str, report_data: Dict[str, Any]):
+    """Write a report to the results directory"""
+    results_dir = os.path.join(os.path.dirname(__file__), "results")
+    os.makedirs(results_dir, exist_ok=True)
+    with open(os.path.join(results_dir, report_id), "wb") as f:
+        f.write(orjson.dumps(report_data, option=orjson.OPT_INDENT_2))
+
 @app.post("/run-goal")
-async def run_goal_test(payload: dict, token: str = Depends(get_current_user)):
+async def run_goal_test(payload: dict, background_tasks: BackgroundTasks, token: str = Depends(get_current_user)):
     goal = payload.get("goal")
     if not goal:
         raise HTTPException(status_code=400, detail="Goal is required")
@@ -46,24 +142,24 @@ async def run_goal_test(payload: dict, token: str = Depends(get_current_user)):
     # Save start time
     start_time = datetime.datetime.now()
     
-    # Build command - use the main.py implementation with --goal parameter
-    cmd = ["python", os.path.join(os.path.dirname(__file__), "main.py"), "--goal", goal]
+    # Build arguments - use the main.py implementation with --goal parameter
+    argv = ["--goal", goal]
     if verbose:
-        cmd.append("--verbose")
+        argv.append("--verbose")
     if max_steps:
-        cmd.extend(["--max-steps", str(max_steps)])
+        argv.extend(["--max-steps", str(max_steps)])
     
     try:
-        result = subprocess.run(cmd, capture_output=True, text=True)
+        result = await run_cli(argv)
         
         # Calculate elapsed time
         end_time = datetime.datetime.now()
         elapsed_time = (end_time - start_time).total_seconds()
         
         response_data = {
-            "success": result.returncode == 0, 
-            "output": result.stdout, 
-            "error": result.stderr,
+            "success": result["returncode"] == 0, 
+            "output": result["stdout"], 
+            "error": result["stderr"],
             "elapsed_time": elapsed_time,
             "start_time": start_time.isoformat(),
             "end_time": end_time.isoformat()
@@ -71,8 +167,6 @@ async def run_goal_test(payload: dict, token: str = Depends(get_current_user)):
         
         # Save report
         report_id = f"goal_test_{start_time.strftime('%Y%m%d_%H%M%S')}.json"
-        results_dir = os.path.join(os.path.dirname(__file__), "results")
-        os.makedirs(results_dir, exist_ok=True)
         
         report_data = {
             "type": "Goal-Based Test",
@@ -83,8 +177,8 @@ async def run_goal_test(payload: dict, token: str = Depends(get_current_user)):
             "result": response_data
         }
         
-        with open(os.path.join(results_dir, report_id), "w") as f:
-            json.dump(report_data, f, indent=2)
+        # Written after the response has been sent
+        background_tasks.add_task(save_report, report_id, report_data)
             
         return response_data
     except Exception as e:
@@ -93,16 +187,7 @@ async def run_goal_test(payload: dict, token: str = Depends(get_current_user)):
 @app.get("/attack-goals")
 async def get_attack_goals(token: str = Depends(get_current_user)):
     """Get the list of predefined attack goals from main.py's settings"""
-    try:
-        # Import the default attack goals from the settings module
-        sys.path.append(os.path.dirname(__file__))
-        from config.settings import DEFAULT_ATTACK_GOALS
-        return {"goals": DEFAULT_ATTACK_GOALS}
-    except ImportError:
-        # Fallback in case the import fails
-        return {"goals": []}
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error fetching attack goals: {str(e)}")
+    return {"goals": DEFAULT_ATTACK_GOALS}
 
 @app.post("/run-task")
 async def run_task_test(
@@ -117,23 +202,31 @@ async def run_task_test(
     
     # Create temporary file with safe handling
     temp_fd, temp_path = tempfile.mkstemp(suffix='.json')
+    os.close(temp_fd)
     try:
-        with os.fdopen(temp_fd, 'wb') as f:
-            # Process the file in chunks to handle large files
-            chunk_size = 1024 * 1024  # 1MB chunks
-            while content := file.file.read(chunk_size):
-                f.write(content)
+        async with aiofiles.open(temp_path, 'wb') as f:
+            # Copy the upload in large chunks, yielding to the event loop between them
+            while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+                await f.write(chunk)
         
-        # Build command - use main.py with --config parameter
-        cmd = ["python", os.path.join(os.path.dirname(__file__), "main.py"), "--config", temp_path]
+        # Index task names from the uploaded config once, for the report
+        try:
+            async with aiofiles.open(temp_path, 'rb') as f:
+                config_data = orjson.loads(await f.read())
+            task_names = {task.get("id"): task.get("name") for task in config_data.get("tasks", [])}
+        except:
+            task_names = {}  # If we can't parse the config file, just use the task_id
+        
+        # Build arguments - use main.py with --config parameter
+        argv = ["--config", temp_path]
         if task_id:
-            cmd.extend(["--task", task_id])
+            argv.extend(["--task", task_id])
         else:
-            cmd.append("--run-all")
+            argv.append("--run-all")
         if verbose:
-            cmd.append("--verbose")
+            argv.append("--verbose")
         
-        result = subprocess.run(cmd, capture_output=True, text=True)
+        result = await run_cli(argv)
         
         # Calculate elapsed time
         end_time = datetime.datetime.now()
@@ -144,9 +237,9 @@ async def run_task_test(
         
         # Generate response
         response_data = {
-            "success": result.returncode == 0, 
-            "output": result.stdout, 
-            "error": result.stderr,
+            "success": result["returncode"] == 0, 
+            "output": result["stdout"], 
+            "error": result["stderr"],
             "elapsed_time": elapsed_time,
             "start_time": start_time.isoformat(),
             "end_time": end_time.isoformat()
@@ -154,21 +247,8 @@ async def run_task_test(
         
         # Save report
         report_id = f"task_test_{start_time.strftime('%Y%m%d_%H%M%S')}.json"
-        results_dir = os.path.join(os.path.dirname(__file__), "results")
-        os.makedirs(results_dir, exist_ok=True)
         
-        # Try to get task name from config file
-        task_name = task_id if task_id else "All Tasks"
-        try:
-            with open(temp_path, 'r') as f:
-                config_data = json.load(f)
-                if task_id:
-                    for task in config_data.get("tasks", []):
-                        if task.get("id") == task_id:
-                            task_name = task.get("name", task_id)
-                            break
-        except:
-            pass  # If we can't parse the config file, just use the task_id
+        task_name = (task_names.get(task_id) or task_id) if task_id else "All Tasks"
         
         report_data = {
             "type": "Task-Based Test",
@@ -179,8 +259,8 @@ async def run_task_test(
             "result": response_data
         }
         
-        with open(os.path.join(results_dir, report_id), "w") as f:
-            json.dump(report_data, f, indent=2)
+        # Written after the response has been sent
+        background_tasks.add_task(save_report, report_id, report_data)
             
         return response_data
     except Exception as e:
@@ -188,6 +268,31 @@ async def run_task_test(
         background_tasks.add_task(cleanup_temp_file, temp_path)
         raise HTTPException(status_code=500, detail=f"Error running test: {str(e)}")
 
+# Listing entry for each report file, reused while the file's mtime is unchanged
+report_cache: Dict[str, Tuple[float, Dict[str, Any]]] = {}
+
+def _read_report_info(f: str, file_path: str, mtime: float) -> Dict[str, Any]:
+    """Parse a report file into its listing entry"""
+    try:
+        with open(file_path, 'rb') as report_file:
+            report_data = orjson.loads(report_file.read())
+            return {
+                "id": f,
+                "name": report_data.get("name", f),
+                "type": report_data.get("type", "Unknown"),
+                "date": report_data.get("date", ""),
+                "time": report_data.get("time", ""),
+                "timestamp": mtime
+            }
+    except:
+        # Fall back to basic info if JSON parsing fails
+        return {
+            "id": f,
+            "name": f,
+            "type": "Unknown",
+            "timestamp": mtime
+        }
+
 @app.get("/reports")
 async def list_reports(token: str = Depends(get_current_user)):
     # List reports from results directory
@@ -196,36 +301,66 @@ async def list_reports(token: str = Depends(get_current_user)):
         return {"reports": []}
         
     reports = []
-    for f in os.listdir(results_dir):
-        if f.endswith(".json"):
-            file_path = os.path.join(results_dir, f)
-            try:
-                with open(file_path, 'r') as report_file:
-                    report_data = json.load(report_file)
-                    report_info = {
-                        "id": f,
-                        "name": report_data.get("name", f),
-                        "type": report_data.get("type", "Unknown"),
-                        "date": report_data.get("date", ""),
-                        "time": report_data.get("time", ""),
-                        "timestamp": os.path.getmtime(file_path)
-                    }
-                    reports.append(report_info)
-            except:
-                # Fall back to basic info if JSON parsing fails
-                reports.append({
-                    "id": f,
-                    "name": f,
-                    "type": "Unknown",
-                    "timestamp": os.path.getmtime(file_path)
-                })
+    seen = set()
+    with os.scandir(results_dir) as entries:
+        for entry in entries:
+            if entry.name.endswith(".json") and entry.is_file():
+                f = entry.name
+                mtime = entry.stat().st_mtime
+                cached = report_cache.get(f)
+                if cached and cached[0] == mtime:
+                    report_info = cached[1]
+                else:
+                    report_info = _read_report_info(f, entry.path, mtime)
+                    report_cache[f] = (mtime, report_info)
+                reports.append(report_info)
+                seen.add(f)
+    
+    # Forget reports that were removed
+    for f in report_cache.keys() - seen:
+        del report_cache[f]
     
     # Sort by timestamp descending
     reports.sort(key=lambda x: x["timestamp"], reverse=True)
     return {"reports": reports}
 
-def generate_pdf_from_report(report_data):
-    """Generate a PDF from the report data"""
+REPORT_CSS = """
+    body { font-family: Arial, sans-serif; margin: 40px; }
+    h1 { color: #2c3e50; }
+    h2 { color: #3498db; margin-top: 30px; }
+    pre { background-color: #f8f9fa; padding: 15px; border-radius: 5px; overflow-x: auto; }
+    .info-item { margin-bottom: 10px; }
+    .success { color: green; }
+    .failed { color: red; }
+"""
+
+REPORT_HTML_TEMPLATE = Template(f"""<!DOCTYPE html>
+    <html>
+    <head>
+        <title>Security Test Report</title>
+        <style>{REPORT_CSS}</style>
+    </head>
+    <body>
+        $body
+    </body>
+    </html>
+    """)
+
+# Markdown instances are reusable via reset() but not thread-safe
+markdown_converter = markdown.Markdown()
+markdown_lock = threading.Lock()
+
+# wkhtmltopdf is located and configured once instead of on every conversion
+try:
+    WKHTMLTOPDF_CONFIG = pdfkit.configuration(wkhtmltopdf=shutil.which("wkhtmltopdf") or "")
+except OSError:
+    WKHTMLTOPDF_CONFIG = None
+WKHTMLTOPDF_OPTIONS = {"quiet": "", "encoding": "UTF-8"}
+
+PAGE_BREAK = '<div style="page-break-before: always"></div>'
+
+def render_report_html(report_data):
+    """Render the body HTML of a single report"""
     # Create markdown content
     md_content = f"""
 # Security Test Report
@@ -250,73 +385,142 @@ def generate_pdf_from_report(report_data):
 """
     
     # Convert markdown to HTML
-    html_content = markdown.markdown(md_content)
-    
+    with markdown_lock:
+        return markdown_converter.reset().convert(md_content)
+
+def render_pdf(html_content):
+    """Render report body HTML to PDF, or return the HTML document if no renderer works"""
     # Wrap in proper HTML document
-    html_doc = f"""
-    <!DOCTYPE html>
-    <html>
-    <head>
-        <title>Security Test Report</title>
-        <style>
-            body {{ font-family: Arial, sans-serif; margin: 40px; }}
-            h1 {{ color: #2c3e50; }}
-            h2 {{ color: #3498db; margin-top: 30px; }}
-            pre {{ background-color: #f8f9fa; padding: 15px; border-radius: 5px; overflow-x: auto; }}
-            .info-item {{ margin-bottom: 10px; }}
-            .success {{ color: green; }}
-            .failed {{ color: red; }}
-        </style>
-    </head>
-    <body>
-        {html_content}
-    </body>
-    </html>
-    """
+    html_doc = REPORT_HTML_TEMPLATE.substitute(body=html_content)
+    
+    # Render in-process with WeasyPrint when available, avoiding a wkhtmltopdf process per PDF
+    if WeasyHTML is not None:
+        try:
+            return WeasyHTML(string=html_doc).write_pdf()
+        except Exception:
+            pass
     
     # Convert HTML to PDF using pdfkit
     try:
-        pdf_content = pdfkit.from_string(html_doc, False)
+        if WKHTMLTOPDF_CONFIG is None:
+            raise OSError("wkhtmltopdf not found")
+        pdf_content = pdfkit.from_string(html_doc, False, configuration=WKHTMLTOPDF_CONFIG, options=WKHTMLTOPDF_OPTIONS)
         return pdf_content
     except Exception as e:
         # If PDF generation fails, fallback to HTML
         return html_doc.encode('utf-8')
 
+def generate_pdf_from_report(report_data):
+    """Generate a PDF from the report data"""
+    return render_pdf(render_report_html(report_data))
+
+def generate_pdf_from_reports(reports_data):
+    """Generate a single PDF with one report per page, rendered in one pass"""
+    return render_pdf(PAGE_BREAK.join(render_report_html(report_data) for report_data in reports_data))
+
+# Rendered PDFs are kept next to the reports and served straight from disk
+PDF_CACHE_DIR = os.path.join(os.path.dirname(__file__), "results", "pdf")
+
+def _cached_pdf_stat(pdf_path: str, report_mtime: float) -> Optional[os.stat_result]:
+    """Stat a cached PDF, or return None if it is missing or older than its report"""
+    try:
+        pdf_stat = os.stat(pdf_path)
+    except OSError:
+        return None
+    return pdf_stat if pdf_stat.st_mtime >= report_mtime else None
+
 @app.get("/report/{report_id}/pdf")
 async def get_report_pdf(report_id: str, token: str = Depends(get_current_user)):
     report_path = os.path.join(os.path.dirname(__file__), "results", report_id)
     if not os.path.exists(report_path):
         raise HTTPException(status_code=404, detail="Report not found")
     
+    report_stat = os.stat(report_path)
+    
     try:
-        # Load the report data
-        with open(report_path, 'r') as f:
-            report_data = json.load(f)
-        
-        # Generate PDF from report data
-        pdf_content = generate_pdf_from_report(report_data)
-        
-        # Check if we got PDF or HTML (fallback)
-        content_type = "application/pdf"
-        file_extension = "pdf"
+        # Reports are immutable once written, so a rendered PDF stays valid until the report changes
+        pdf_path = os.path.join(PDF_CACHE_DIR, f"{report_id}.pdf")
+        pdf_stat = _cached_pdf_stat(pdf_path, report_stat.st_mtime)
         
-        # If the content starts with <!DOCTYPE html>, it's HTML
-        if pdf_content.startswith(b"<!DOCTYPE html>") or pdf_content.startswith(b"<html"):
-            content_type = "text/html"
-            file_extension = "html"
+        if pdf_stat is None:
+            # Load the report data
+            with open(report_path, 'rb') as f:
+                report_data = orjson.loads(f.read())
+            
+            # Generate PDF from report data
+            pdf_content = generate_pdf_from_report(report_data)
+            
+            # If the content starts with <!DOCTYPE html>, it's the HTML fallback; it is not cached
+            html_start = pdf_content.lstrip()
+            if html_start.startswith(b"<!DOCTYPE html>") or html_start.startswith(b"<html"):
+                return Response(
+                    content=pdf_content,
+                    media_type="text/html",
+                    headers={"Content-Disposition": f"attachment; filename=report_{report_id}.html"}
+                )
+            
+            # Write atomically so concurrent downloads never see a partial file
+            os.makedirs(PDF_CACHE_DIR, exist_ok=True)
+            tmp_path = f"{pdf_path}.{os.getpid()}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(pdf_content)
+            os.replace(tmp_path, pdf_path)
+            pdf_stat = os.stat(pdf_path)
         
         # Return the response
-        return Response(
-            content=pdf_content,
-            media_type=content_type,
-            headers={"Content-Disposition": f"attachment; filename=report_{report_id}.{file_extension}"}
+        return FileResponse(
+            path=pdf_path,
+            media_type="application/pdf",
+            filename=f"report_{report_id}.pdf",
+            stat_result=pdf_stat
         )
     except Exception as e:
         # Fallback to just returning the JSON file if PDF generation fails
         return FileResponse(
             path=report_path,
             media_type="application/json",
-            filename=f"report_{report_id}.json"
+            filename=f"report_{report_id}.json",
+            stat_result=report_stat
         )
 
-# Add this import at the top of the file
+@app.post("/reports/pdf")
+def get_reports_pdf(payload: dict, token: str = Depends(get_current_user)):
+    """
+    Render several reports ({"ids": [...]}) into one PDF with a single renderer run.
+    A plain def, so FastAPI runs the file reads and the render in its threadpool
+    instead of on the event loop.
+    """
+    results_dir = os.path.realpath(os.path.join(os.path.dirname(__file__), "results"))
+    report_ids = payload.get("ids")
+    if not isinstance(report_ids, list) or not report_ids:
+        raise HTTPException(status_code=400, detail="No report ids given")
+    
+    reports_data = []
+    for report_id in report_ids:
+        # Only plain file names inside the results directory are accepted
+        if not isinstance(report_id, str) or report_id in ("", ".", "..") or os.path.basename(report_id) != report_id:
+            raise HTTPException(status_code=400, detail=f"Invalid report id: {report_id}")
+        report_path = os.path.realpath(os.path.join(results_dir, report_id))
+        if os.path.dirname(report_path) != results_dir:
+            raise HTTPException(status_code=400, detail=f"Invalid report id: {report_id}")
+        if not os.path.isfile(report_path):
+            raise HTTPException(status_code=404, detail=f"Report not found: {report_id}")
+        with open(report_path, 'rb') as f:
+            try:
+                reports_data.append(orjson.loads(f.read()))
+            except orjson.JSONDecodeError:
+                raise HTTPException(status_code=422, detail=f"Report is not valid JSON: {report_id}")
+    
+    pdf_content = generate_pdf_from_reports(reports_data)
+    
+    html_start = pdf_content.lstrip()
+    if html_start.startswith(b"<!DOCTYPE html>") or html_start.startswith(b"<html"):
+        content_type, file_extension = "text/html", "html"
+    else:
+        content_type, file_extension = "application/pdf", "pdf"
+    
+    return Response(
+        content=pdf_content,
+        media_type=content_type,
+        headers={"Content-Disposition": f"attachment; filename=reports.{file_extension}"}
+    )
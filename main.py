@@ -1,11 +1,13 @@
 #!/usr/bin/env python3
 import os
 import sys
-import json
+import orjson
 import time
 import argparse
+import atexit
+from concurrent.futures import ThreadPoolExecutor, Future
 from typing import List, Dict, Any, Optional
-from rich.console import Console
+from rich.console import Console, Group
 from rich.table import Table
 from rich.panel import Panel
 from rich.prompt import Prompt
@@ -13,12 +15,41 @@ from rich.progress import Progress, SpinnerColumn, TextColumn
 
 from config.settings import DEFAULT_ATTACK_GOALS
 from utils.attack_config_parser import AttackConfigParser
-from utils.attack_runner import AttackRunner
-from utils.context_manager import ContextManager
-from workflows.attack_workflow import run_attack_workflow
 
 console = Console()
 
+# Results are written in the background so rendering never waits on disk;
+# run_cli waits for the writes of its run before returning
+_io_pool = ThreadPoolExecutor(max_workers=1)
+atexit.register(_io_pool.shutdown, wait=True)
+_pending_writes: List[Future] = []
+
+class HeadlessProgress:
+    """Stand-in for rich's Progress when output is not a terminal (e.g. run by the backend)"""
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc_info):
+        return False
+    
+    def add_task(self, description: str, total: Optional[float] = None) -> int:
+        return 0
+    
+    def update(self, task_id: int, **kwargs) -> None:
+        pass
+
+def create_progress():
+    """Create a spinner progress display, or a no-op one when nobody can see it"""
+    if not console.is_terminal:
+        return HeadlessProgress()
+    return Progress(
+        SpinnerColumn(),
+        TextColumn("[bold blue]{task.description}"),
+        transient=True,
+        console=console,
+    )
+
 def print_banner():
     """Print the application banner"""
     banner = """
@@ -96,7 +127,7 @@ def select_task(tasks: List[Dict[str, Any]]) -> str:
     """Allow user to select a task from the config file"""
     display_tasks(tasks)
     
-    task_ids = [task["id"] for task in tasks]
+    task_ids = {task["id"] for task in tasks}
     
     while True:
         try:
@@ -108,6 +139,26 @@ def select_task(tasks: List[Dict[str, Any]]) -> str:
         except Exception as e:
             console.print(f"[red]Error: {str(e)}[/red]")
 
+def _write_results(filename: str, results: Dict[str, Any]):
+    """Encode the attack results and write them to filename"""
+    os.makedirs(os.path.dirname(filename), exist_ok=True)
+    with open(filename, "wb") as f:
+        f.write(orjson.dumps(results, option=orjson.OPT_INDENT_2))
+
+def _save_results(filename: str, results: Dict[str, Any]):
+    """Write the attack results and report whether they were saved"""
+    try:
+        _write_results(filename, results)
+    except Exception as e:
+        console.print(f"\n[red]Error saving results to {filename}: {str(e)}[/red]")
+        return
+    console.print(f"\n[blue]Results saved to: {filename}[/blue]")
+
+def _wait_for_writes():
+    """Wait until the results queued by this run are written and reported"""
+    while _pending_writes:
+        _pending_writes.pop(0).result()
+
 def display_attack_results(results: Dict[str, Any]):
     """Display the attack results in a formatted manner"""
     if not results:
@@ -122,14 +173,21 @@ def display_attack_results(results: Dict[str, Any]):
     if not steps:
         console.print("[yellow]No attack steps were performed[/yellow]")
     else:
+        step_panels = []
         for i, step in enumerate(steps):
-            step_panel = Panel(
-                f"[bold]Command:[/bold] {step.get('command', 'N/A')}\n\n"
-                f"[bold]Output:[/bold]\n{step.get('output', 'N/A')[:500]}{'...' if len(step.get('output', '')) > 500 else ''}",
-                title=f"Step {i+1}: {step.get('plan', 'Action')}",
+            command = step.get('command', 'N/A')
+            plan = step.get('plan', 'Action')
+            output = step.get('output') or 'N/A'
+            truncated = output[:500] + ('...' if len(output) > 500 else '')
+            step_panels.append(Panel(
+                f"[bold]Command:[/bold] {command}\n\n"
+                f"[bold]Output:[/bold]\n{truncated}",
+                title=f"Step {i+1}: {plan}",
                 border_style="green"
-            )
-            console.print(step_panel)
+            ))
+        
+        # Render all steps in one print rather than one console round-trip per step
+        console.print(Group(*step_panels))
     
     # Display vulnerabilities found
     vulnerabilities = results.get('vulnerabilities', [])
@@ -152,27 +210,21 @@ def display_attack_results(results: Dict[str, Any]):
     timestamp = time.strftime("%Y%m%d-%H%M%S")
     filename = f"results/attack_results_{timestamp}.json"
     
-    os.makedirs("results", exist_ok=True)
-    with open(filename, "w") as f:
-        json.dump(results, f, indent=2)
-    
-    console.print(f"\n[blue]Results saved to: {filename}[/blue]")
+    # Reported once the write has actually finished (or failed)
+    _pending_writes.append(_io_pool.submit(_save_results, filename, results))
 
 def run_single_task(task_id: str, config_parser: AttackConfigParser, verbose: bool = False):
     """Run a single task from the attack configuration"""
+    from utils.attack_runner import AttackRunner
+    
     runner = AttackRunner(verbose=verbose)
     
-    with Progress(
-        SpinnerColumn(),
-        TextColumn("[bold blue]{task.description}"),
-        transient=True,
-    ) as progress:
+    with create_progress() as progress:
         prog_task = progress.add_task(f"[green]Running task {task_id}...", total=None)
         
         try:
-            # Load configuration and run only the specified task
-            runner.load_attack_config(config_parser.get_output_dir() + "/attack_tasks.json")
-            results = runner.run_attack(config_parser.get_output_dir() + "/attack_tasks.json")
+            # Run only the specified task from the already-parsed configuration
+            results = runner.run_attack(config_parser.config, task_ids=[task_id])
             task_result = results["tasks"].get(task_id, {"error": f"Task {task_id} not found in results"})
             progress.update(prog_task, completed=True, description=f"[green]Task {task_id} completed!")
             return task_result
@@ -183,20 +235,17 @@ def run_single_task(task_id: str, config_parser: AttackConfigParser, verbose: bo
 
 def run_multiple_tasks(task_ids: List[str], config_parser: AttackConfigParser, verbose: bool = False):
     """Run multiple tasks from the attack configuration"""
+    from utils.attack_runner import AttackRunner
+    
     runner = AttackRunner(verbose=verbose)
     all_results = []
     
-    with Progress(
-        SpinnerColumn(),
-        TextColumn("[bold blue]{task.description}"),
-        transient=True,
-    ) as progress:
+    with create_progress() as progress:
         prog_task = progress.add_task(f"[green]Running all tasks...", total=None)
         
         try:
-            # Run all tasks in the configuration
-            runner.load_attack_config(config_parser.get_output_dir() + "/attack_tasks.json")
-            results = runner.run_attack(config_parser.get_output_dir() + "/attack_tasks.json")
+            # Run the requested tasks in a single pass over the already-parsed configuration
+            results = runner.run_attack(config_parser.config, task_ids=task_ids)
             for task_id in task_ids:
                 task_result = results["tasks"].get(task_id, {"error": f"Task {task_id} not found in results"})
                 all_results.append({"task_id": task_id, "results": task_result})
@@ -209,14 +258,14 @@ def run_multiple_tasks(task_ids: List[str], config_parser: AttackConfigParser, v
     
 def run_traditional_attack(goal: str, verbose: bool = False, max_steps: Optional[int] = None):
     """Run a traditional attack with a goal (for backward compatibility)"""
-    context_manager = ContextManager()
+    # The workflow pulls in LangChain/LangGraph, so only import it when an attack actually runs
+    from utils.context_manager import ContextManager
+    from workflows.attack_workflow import run_attack_workflow
+    
+    context_manager = ContextManager(load=False)
     context_manager.set_attack_goal(goal)
     
-    with Progress(
-        SpinnerColumn(),
-        TextColumn("[bold blue]{task.description}"),
-        transient=True,
-    ) as progress:
+    with create_progress() as progress:
         task = progress.add_task("[green]Running security test...", total=None)
         
         try:
@@ -235,8 +284,8 @@ def run_traditional_attack(goal: str, verbose: bool = False, max_steps: Optional
             console.print(f"[red]Error: {str(e)}[/red]")
             return None
 
-def parse_arguments():
-    """Parse command line arguments"""
+def parse_arguments(argv: Optional[List[str]] = None):
+    """Parse command line arguments (from sys.argv unless argv is given)"""
     parser = argparse.ArgumentParser(description="AutoAttacker - Autonomous Security Testing Agent")
     parser.add_argument("--goal", "-g", type=str, help="Security testing goal (traditional mode)")
     parser.add_argument("--verbose", "-v", action="store_true", help="Enable verbose output")
@@ -246,12 +295,30 @@ def parse_arguments():
     parser.add_argument("--task", "-t", type=str, help="Task ID to run from configuration file")
     parser.add_argument("--run-all", "-a", action="store_true", help="Run all tasks in the configuration file")
     
-    return parser.parse_args()
+    return parser.parse_args(argv)
 
-def main():
-    """Main entry point for the application"""
-    args = parse_arguments()
+def run_cli(args: argparse.Namespace) -> int:
+    """
+    Run the application for parsed arguments without exiting the interpreter,
+    so it can also be called in-process (e.g. by the backend)
     
+    Args:
+        args: Arguments as returned by parse_arguments
+        
+    Returns:
+        Process exit code
+    """
+    # A console per run, bound to the current stdout, so a run captured by the
+    # backend detects a non-terminal and prints no colour codes
+    global console
+    console = Console(file=sys.stdout)
+    try:
+        return _run(args)
+    finally:
+        _wait_for_writes()
+
+def _run(args: argparse.Namespace) -> int:
+    """Run the application for parsed arguments; see run_cli"""
     print_banner()
     
     # Check if we're using the new task-based approach or traditional mode
@@ -263,12 +330,13 @@ def main():
             
             if not config_parser.get_tasks():  # Check if there are tasks defined
                 console.print("[red]Error: No tasks found in configuration file.[/red]")
-                sys.exit(1)
+                return 1
             
             if args.task:
                 # Run a specific task
-                console.print(f"\n[bold]Running task:[/bold] {args.task}\n")
-                results = run_single_task(args.task, config_parser, args.verbose)
+                task_id = sys.intern(args.task)
+                console.print(f"\n[bold]Running task:[/bold] {task_id}\n")
+                results = run_single_task(task_id, config_parser, args.verbose)
                 if results:
                     display_attack_results(results)
             elif args.run_all:
@@ -283,13 +351,16 @@ def main():
                 table.add_column("Status", style="green")
                 table.add_column("Vulnerabilities", style="red")
                 
-                for result in all_results:
-                    task_id = result["task_id"]
-                    task_results = result["results"]
-                    status = "Completed" if task_results else "Failed"
-                    vuln_count = len(task_results.get("vulnerabilities", [])) if task_results else 0
-                    
-                    table.add_row(task_id, status, str(vuln_count))
+                rows = [
+                    (
+                        result["task_id"],
+                        "Completed" if result["results"] else "Failed",
+                        str(len(result["results"].get("vulnerabilities", [])) if result["results"] else 0)
+                    )
+                    for result in all_results
+                ]
+                for row in rows:
+                    table.add_row(*row)
                 
                 console.print(table)
             elif args.interactive:
@@ -304,7 +375,7 @@ def main():
                 console.print("[red]Error: Please specify a task ID with --task or use --run-all to run all tasks.[/red]")
         except Exception as e:
             console.print(f"[red]Error loading configuration: {str(e)}[/red]")
-            sys.exit(1)
+            return 1
     else:
         # Traditional mode
         goal = args.goal
@@ -313,7 +384,7 @@ def main():
                 goal = select_attack_goal()
             else:
                 console.print("[red]Error: No goal specified. Use --goal or --interactive, or use --config for task-based mode.[/red]")
-                sys.exit(1)
+                return 1
         
         console.print(f"\n[bold]Starting security test with goal:[/bold] {goal}\n")
         
@@ -325,6 +396,12 @@ def main():
         
         if results:
             display_attack_results(results)
+    
+    return 0
+
+def main():
+    """Main entry point for the application"""
+    sys.exit(run_cli(parse_arguments()))
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
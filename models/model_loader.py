@@ -1,19 +1,28 @@
-from langchain_openai import AzureChatOpenAI
+from functools import lru_cache
+
+from langchain_openai import AzureChatOpenAI, ChatOpenAI
 from config.settings import (
     AZURE_OPENAI_API_KEY,
     AZURE_OPENAI_ENDPOINT,
     AZURE_DEPLOYMENT_NAME,
     AZURE_EMBEDDING_DEPLOYMENT_NAME,
     AZURE_OPENAI_API_VERSION,
+    LLM_BASE_URL,
+    LLM_API_KEY,
+    INTERPRETER_LLM_BASE_URL,
     PLANNER_MODEL,
     INTERPRETER_MODEL,
     SUMMARIZER_MODEL,
     EXTRACTOR_MODEL
 )
 
+@lru_cache(maxsize=16)
 def load_azure_openai_model(deployment_name, temperature=0.1):
     """
     Load an Azure OpenAI model with specified parameters
+    
+    Clients are cached per (deployment, temperature) so every agent using
+    the same settings shares one HTTP connection pool.
     """
     return AzureChatOpenAI(
         api_key=AZURE_OPENAI_API_KEY,
@@ -23,18 +32,46 @@ def load_azure_openai_model(deployment_name, temperature=0.1):
         temperature=temperature
     )
 
+@lru_cache(maxsize=16)
+def load_openai_compatible_model(model_name, temperature=0.1, base_url=LLM_BASE_URL):
+    """
+    Load a model served by an OpenAI-compatible server such as vLLM.
+    
+    All agents share the same server, whose continuous-batching scheduler
+    merges concurrent planner/interpreter/extractor requests.
+    """
+    return ChatOpenAI(
+        base_url=base_url,
+        api_key=LLM_API_KEY,
+        model=model_name,
+        temperature=temperature
+    )
+
+def load_model(model_name, temperature=0.1, base_url=LLM_BASE_URL):
+    """
+    Load a model from the given OpenAI-compatible server if one is configured,
+    falling back to the Azure OpenAI deployment otherwise
+    """
+    if base_url:
+        return load_openai_compatible_model(model_name, temperature, base_url)
+    return load_azure_openai_model(AZURE_DEPLOYMENT_NAME, temperature)
+
+@lru_cache(maxsize=1)
 def get_planner_model():
     """Get the model used for attack planning"""
-    return load_azure_openai_model(AZURE_DEPLOYMENT_NAME, temperature=0.2)
+    return load_model(PLANNER_MODEL, temperature=0.2)
 
+@lru_cache(maxsize=1)
 def get_interpreter_model():
     """Get the model used for command interpretation"""
-    return load_azure_openai_model(AZURE_DEPLOYMENT_NAME, temperature=0.1)
+    return load_model(INTERPRETER_MODEL, temperature=0.1, base_url=INTERPRETER_LLM_BASE_URL or LLM_BASE_URL)
 
+@lru_cache(maxsize=1)
 def get_summarizer_model():
     """Get the model used for context summarization"""
-    return load_azure_openai_model(AZURE_DEPLOYMENT_NAME, temperature=0.1)
+    return load_model(SUMMARIZER_MODEL, temperature=0.1)
 
+@lru_cache(maxsize=1)
 def get_extractor_model():
     """Get the model used for vulnerability extraction and remediation"""
-    return load_azure_openai_model(AZURE_DEPLOYMENT_NAME, temperature=0.1)
\ No newline at end of file
+    return load_model(EXTRACTOR_MODEL, temperature=0.1)
\ No newline at end of file
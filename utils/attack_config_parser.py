@@ -6,15 +6,35 @@ It validates the configuration structure and prepares it for use by the attack w
 """
 
 import os
+import sys
+import copy
 import json
-from typing import Dict, List, Any, Optional, Union
+from collections import deque
+from typing import Dict, List, Any, Optional, Tuple, Union
+
+import orjson
+
+# Keys every configuration, its target and each of its tasks must define
+REQUIRED_CONFIG_KEYS = frozenset({"target", "tasks"})
+REQUIRED_TARGET_KEYS = frozenset({"host"})
+REQUIRED_TASK_KEYS = frozenset({"id", "name", "goal"})
+
+# Parsed configs by real path, as (mtime_ns, size, config)
+_CONFIG_CACHE: Dict[str, Tuple[int, int, Dict[str, Any]]] = {}
 
 
 class AttackConfigParser:
     """Parser for attack configuration files in JSON format"""
     
+    __slots__ = ("config", "_global_settings", "_target", "_task_index", "_task_targets", "_task_order")
+    
     def __init__(self):
         self.config = {}
+        self._global_settings = {}
+        self._target = {}
+        self._task_index = {}
+        self._task_targets = {}
+        self._task_order = None
         
     def load_from_file(self, file_path: str) -> Dict[str, Any]:
         """
@@ -34,16 +54,64 @@ class AttackConfigParser:
         if not os.path.exists(file_path):
             raise FileNotFoundError(f"Attack configuration file not found: {file_path}")
             
+        # Reuse the parsed config while the file's mtime and size are unchanged
+        path = os.path.realpath(file_path)
+        stat = os.stat(path)
+        cached = _CONFIG_CACHE.get(path)
+        if cached is not None and cached[:2] == (stat.st_mtime_ns, stat.st_size):
+            return self.load_from_dict(copy.deepcopy(cached[2]))
+            
+        with open(path, 'rb') as f:
+            raw = f.read()
+            
         try:
-            with open(file_path, 'r') as f:
-                self.config = json.load(f)
-                
-            # Validate the configuration structure
-            self._validate_config()
+            config = orjson.loads(raw)
+        except orjson.JSONDecodeError as e:
+            raise json.JSONDecodeError(f"Invalid JSON in configuration file: {e.msg}", e.doc, e.pos)
             
-            return self.config
-        except json.JSONDecodeError as e:
-            raise json.JSONDecodeError(f"Invalid JSON in configuration file: {str(e)}", e.doc, e.pos)
+        self.load_from_dict(config)
+        _CONFIG_CACHE[path] = (stat.st_mtime_ns, stat.st_size, copy.deepcopy(config))
+        return self.config
+    
+    def load_from_dict(self, config: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Load an already-parsed attack configuration
+        
+        Args:
+            config: Attack configuration dictionary
+            
+        Returns:
+            The validated attack configuration
+            
+        Raises:
+            ValueError: If the configuration structure is invalid
+        """
+        self.config = config
+        
+        # Validate the configuration structure
+        self._validate_config()
+        
+        # Intern task IDs so the repeated lookups by ID hit the identity fast path
+        for task in self.config["tasks"]:
+            if isinstance(task["id"], str):
+                task["id"] = sys.intern(task["id"])
+        
+        # Cache frequently read sections, index tasks by ID and drop any
+        # order resolved for a previous config
+        self._global_settings = self.config.get("global_settings", {})
+        self._target = self.config["target"]
+        self._task_index = {task["id"]: task for task in self.config["tasks"]}
+        self._task_order = None
+        
+        # Merge per-task target overrides with the global target once, with
+        # the task target taking precedence
+        self._task_targets = {
+            task["id"]: {**self._target, **task["target"]}
+            for task in self.config["tasks"]
+            if task.get("target")
+        }
+        
+        return self.config
     
     def _validate_config(self) -> None:
         """
@@ -52,21 +120,22 @@ class AttackConfigParser:
         Raises:
             ValueError: If the configuration structure is invalid
         """
+        if not isinstance(self.config, dict):
+            raise ValueError("Configuration must be a JSON object")
+            
         # Check for required top-level keys
-        required_keys = ["target", "tasks"]
-        for key in required_keys:
-            if key not in self.config:
-                raise ValueError(f"Missing required key in configuration: {key}")
+        missing = REQUIRED_CONFIG_KEYS - self.config.keys()
+        if missing:
+            raise ValueError(f"Missing required key in configuration: {', '.join(sorted(missing))}")
         
         # Validate target information
         target = self.config["target"]
         if not isinstance(target, dict):
             raise ValueError("Target must be a dictionary")
             
-        required_target_keys = ["host"]
-        for key in required_target_keys:
-            if key not in target:
-                raise ValueError(f"Missing required key in target configuration: {key}")
+        missing = REQUIRED_TARGET_KEYS - target.keys()
+        if missing:
+            raise ValueError(f"Missing required key in target configuration: {', '.join(sorted(missing))}")
         
         # Validate tasks
         tasks = self.config["tasks"]
@@ -74,14 +143,18 @@ class AttackConfigParser:
             raise ValueError("Tasks must be a non-empty list")
             
         # Validate each task
+        seen_ids = set()
         for i, task in enumerate(tasks):
             if not isinstance(task, dict):
                 raise ValueError(f"Task at index {i} must be a dictionary")
                 
-            required_task_keys = ["id", "name", "goal"]
-            for key in required_task_keys:
-                if key not in task:
-                    raise ValueError(f"Missing required key '{key}' in task at index {i}")
+            missing = REQUIRED_TASK_KEYS - task.keys()
+            if missing:
+                raise ValueError(f"Missing required key '{', '.join(sorted(missing))}' in task at index {i}")
+                
+            if task["id"] in seen_ids:
+                raise ValueError(f"Duplicate task ID '{task['id']}' in task at index {i}")
+            seen_ids.add(task["id"])
     
     def get_target_info(self) -> Dict[str, Any]:
         """
@@ -90,7 +163,7 @@ class AttackConfigParser:
         Returns:
             Dictionary containing target system details
         """
-        return self.config.get("target", {})
+        return self._target
     
     def get_global_settings(self) -> Dict[str, Any]:
         """
@@ -99,7 +172,7 @@ class AttackConfigParser:
         Returns:
             Dictionary containing global settings
         """
-        return self.config.get("global_settings", {})
+        return self._global_settings
     
     def get_tasks(self) -> List[Dict[str, Any]]:
         """
@@ -120,11 +193,7 @@ class AttackConfigParser:
         Returns:
             Task dictionary or None if not found
         """
-        tasks = self.get_tasks()
-        for task in tasks:
-            if task.get("id") == task_id:
-                return task
-        return None
+        return self._task_index.get(task_id)
     
     def get_task_dependencies(self, task_id: str) -> List[str]:
         """
@@ -149,38 +218,46 @@ class AttackConfigParser:
         Returns:
             List of task IDs in the order they should be executed
         """
-        tasks = self.get_tasks()
-        task_ids = [task["id"] for task in tasks]
-        ordered_tasks = []
-        visited = set()
-        temp_visited = set()
-        
-        def visit(task_id):
-            if task_id in temp_visited:
-                raise ValueError(f"Circular dependency detected involving task {task_id}")
+        if self._task_order is not None:
+            return list(self._task_order)
             
-            if task_id in visited:
-                return
-                
-            temp_visited.add(task_id)
+        # Without any dependencies the configured order is already valid
+        if not any(task.get("requires") for task in self.get_tasks()):
+            self._task_order = [task["id"] for task in self.get_tasks()]
+            return list(self._task_order)
             
-            # Visit dependencies first
-            deps = self.get_task_dependencies(task_id)
-            for dep_id in deps:
-                if dep_id not in task_ids:
+        # Kahn's algorithm over integer task indices: count unmet dependencies
+        # per task and repeatedly release tasks whose dependencies are scheduled
+        task_ids = [task["id"] for task in self.get_tasks()]
+        index_of = {task_id: i for i, task_id in enumerate(task_ids)}
+        in_degree = [0] * len(task_ids)
+        dependents = [[] for _ in task_ids]
+        
+        for i, task_id in enumerate(task_ids):
+            for dep_id in self.get_task_dependencies(task_id):
+                dep_index = index_of.get(dep_id)
+                if dep_index is None:
                     raise ValueError(f"Task {task_id} depends on non-existent task {dep_id}")
-                visit(dep_id)
-            
-            temp_visited.remove(task_id)
-            visited.add(task_id)
-            ordered_tasks.append(task_id)
+                dependents[dep_index].append(i)
+                in_degree[i] += 1
         
-        # Visit all tasks
-        for task_id in task_ids:
-            if task_id not in visited:
-                visit(task_id)
-                
-        return ordered_tasks
+        ready = deque(i for i, degree in enumerate(in_degree) if degree == 0)
+        order = []
+        while ready:
+            i = ready.popleft()
+            order.append(i)
+            for j in dependents[i]:
+                in_degree[j] -= 1
+                if in_degree[j] == 0:
+                    ready.append(j)
+        
+        if len(order) != len(task_ids):
+            blocked = next(i for i, degree in enumerate(in_degree) if degree > 0)
+            raise ValueError(f"Circular dependency detected involving task {task_ids[blocked]}")
+            
+        ordered_tasks = [task_ids[i] for i in order]
+        self._task_order = ordered_tasks
+        return list(ordered_tasks)
     
     def get_max_steps(self, task_id: Optional[str] = None) -> int:
         """
@@ -246,18 +323,16 @@ class AttackConfigParser:
         Returns:
             Dictionary containing target system details for the task
         """
-        global_target = self.get_target_info()
+        return self._task_targets.get(task_id, self._target)
+    
+    def get_max_parallel_tasks(self) -> int:
+        """
+        Get how many independent tasks may run at the same time
         
-        task = self.get_task_by_id(task_id)
-        if not task:
-            return global_target
-            
-        # If task has its own target, merge with global target with task target taking precedence
-        task_target = task.get("target", {})
-        if not task_target:
-            return global_target
-            
-        return {**global_target, **task_target}
+        Returns:
+            Maximum number of concurrently running tasks, at least 1
+        """
+        return max(1, int(self.get_global_settings().get("max_parallel_tasks", 4)))
     
     def get_output_dir(self) -> str:
         """
@@ -7,14 +7,21 @@ and configurations.
 """
 
 import os
-import json
 import time
-from typing import Dict, List, Any, Optional
+import asyncio
+from typing import Dict, List, Any, Optional, Union
 from datetime import datetime
 
+import orjson
+
 from utils.attack_config_parser import AttackConfigParser
 from utils.context_manager import ContextManager
-from workflows.attack_workflow import run_attack_workflow
+from utils.io_executor import run_io
+from workflows.attack_workflow import arun_attack_workflow
+
+# Task results are pushed to the task log after this many tasks or seconds
+TASK_LOG_FLUSH_EVERY = 5
+TASK_LOG_FLUSH_SECONDS = 5.0
 
 class AttackRunner:
     """
@@ -29,7 +36,6 @@ class AttackRunner:
             verbose: Enable verbose output
         """
         self.config_parser = AttackConfigParser()
-        self.context_manager = ContextManager()
         self.verbose = verbose
         self.results = {
             "tasks": {},
@@ -38,6 +44,12 @@ class AttackRunner:
             "end_time": "",
             "duration_seconds": 0
         }
+        self._results_base = ""
+        self._task_log = None
+        self._tasks_since_flush = 0
+        self._last_flush = 0.0
+        self._task_categories = {}
+        self._category_template = {}
     
     def load_attack_config(self, config_file: str) -> bool:
         """
@@ -56,17 +68,26 @@ class AttackRunner:
             print(f"Error loading attack configuration: {str(e)}")
             return False
     
-    def run_attack(self, config_file: str) -> Dict[str, Any]:
+    def run_attack(self, config: Union[str, Dict[str, Any]],
+                   task_ids: Optional[List[str]] = None) -> Dict[str, Any]:
         """
-        Run the complete attack scenario defined in the configuration file
+        Run the attack scenario defined in the configuration
         
         Args:
-            config_file: Path to the JSON configuration file
+            config: Path to the JSON configuration file, or an already-parsed
+                configuration dictionary
+            task_ids: Optional IDs of the tasks to run; all tasks run if omitted
             
         Returns:
             Dictionary containing the attack results
         """
-        if not self.load_attack_config(config_file):
+        if isinstance(config, dict):
+            try:
+                self.config_parser.load_from_dict(config)
+            except Exception as e:
+                print(f"Error loading attack configuration: {str(e)}")
+                return {"error": "Failed to load attack configuration"}
+        elif not self.load_attack_config(config):
             return {"error": "Failed to load attack configuration"}
         
         # Record start time
@@ -77,9 +98,33 @@ class AttackRunner:
         output_dir = self.config_parser.get_output_dir()
         os.makedirs(output_dir, exist_ok=True)
         
+        # All files of this run share one name: per-task results are appended to
+        # <name>.jsonl as tasks finish and the full results go to <name>.json at the end
+        timestamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+        self._results_base = os.path.join(output_dir, f"attack_results_{timestamp}")
+        try:
+            self._task_log = open(self._results_base + ".jsonl", "wb")
+            self._tasks_since_flush = 0
+            self._last_flush = time.monotonic()
+        except IOError as e:
+            print(f"Error opening task results log: {str(e)}")
+        
         try:
             # Get the order in which tasks should be executed
             task_order = self.config_parser.resolve_task_order()
+            if task_ids is not None:
+                selected = set(task_ids)
+                task_order = [task_id for task_id in task_order if task_id in selected]
+            
+            # Fix the summary's category shape up front from the selected tasks
+            self._task_categories = {
+                task_id: self.config_parser.get_task_by_id(task_id).get("category", "uncategorized")
+                for task_id in task_order
+            }
+            self._category_template = {
+                category: {"total": 0, "completed": 0, "vulnerabilities": 0}
+                for category in self._task_categories.values()
+            }
             
             if self.verbose:
                 print(f"Executing tasks in order: {task_order}")
@@ -87,36 +132,100 @@ class AttackRunner:
             # Initialize task results
             self.results["tasks"] = {}
             
-            # Execute each task in order
-            for task_id in task_order:
-                task_result = self._run_task(task_id)
-                self.results["tasks"][task_id] = task_result
-                
-                # Save intermediate results
-                self._save_results(output_dir)
+            # Execute tasks as soon as their dependencies are done, running
+            # independent branches concurrently
+            asyncio.run(self._run_tasks(task_order))
+            
+            # Report tasks in dependency order rather than completion order
+            self.results["tasks"] = {
+                task_id: self.results["tasks"][task_id]
+                for task_id in task_order
+                if task_id in self.results["tasks"]
+            }
         
         except Exception as e:
             print(f"Error executing attack: {str(e)}")
             self.results["error"] = str(e)
         
-        # Calculate execution time
-        end_time = time.time()
-        duration = end_time - start_time
+        finally:
+            # Calculate execution time
+            end_time = time.time()
+            duration = end_time - start_time
+            
+            # Update results
+            self.results["end_time"] = datetime.now().isoformat()
+            self.results["duration_seconds"] = duration
+            
+            # Generate summary
+            summary = self._generate_summary()
+            self.results["summary"] = summary
+            
+            # Save final results, even if the run was interrupted
+            self._save_results()
         
-        # Update results
-        self.results["end_time"] = datetime.now().isoformat()
-        self.results["duration_seconds"] = duration
+        return self.results
+    
+    async def _run_tasks(self, task_order: List[str]) -> None:
+        """
+        Run tasks concurrently, starting each one once all of its dependencies
+        have completed. Dependencies outside task_order count as satisfied.
         
-        # Generate summary
-        summary = self._generate_summary()
-        self.results["summary"] = summary
+        Args:
+            task_order: IDs of the tasks to run, in dependency order
+        """
+        selected = set(task_order)
+        unmet = {}
+        dependents = {task_id: [] for task_id in task_order}
+        for task_id in task_order:
+            deps = [dep_id for dep_id in self.config_parser.get_task_dependencies(task_id) if dep_id in selected]
+            unmet[task_id] = len(deps)
+            for dep_id in deps:
+                dependents[dep_id].append(task_id)
         
-        # Save final results
-        self._save_results(output_dir)
+        semaphore = asyncio.Semaphore(self.config_parser.get_max_parallel_tasks())
+        running = {}
+        skipped = set()
         
-        return self.results
+        async def run(task_id: str) -> Dict[str, Any]:
+            async with semaphore:
+                return await self._run_task(task_id)
+        
+        def skip(task_id: str, failed_id: str) -> None:
+            if task_id in skipped:
+                return
+            skipped.add(task_id)
+            self.results["tasks"][task_id] = {"error": f"Skipped because task {failed_id} failed"}
+            self._record_task_result(task_id)
+            for dependent_id in dependents[task_id]:
+                skip(dependent_id, failed_id)
+        
+        for task_id in task_order:
+            if unmet[task_id] == 0:
+                running[asyncio.create_task(run(task_id))] = task_id
+        
+        while running:
+            done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+            for future in done:
+                task_id = running.pop(future)
+                failed = future.exception() is not None
+                if failed:
+                    print(f"Error executing task {task_id}: {str(future.exception())}")
+                    self.results["tasks"][task_id] = {"error": str(future.exception())}
+                else:
+                    self.results["tasks"][task_id] = future.result()
+                
+                # Save intermediate results
+                await run_io(self._record_task_result, task_id)
+                
+                for dependent_id in dependents[task_id]:
+                    if failed:
+                        skip(dependent_id, task_id)
+                        continue
+                    unmet[dependent_id] -= 1
+                    if unmet[dependent_id] == 0 and dependent_id not in skipped:
+                        running[asyncio.create_task(run(dependent_id))] = dependent_id
     
-    def _run_task(self, task_id: str) -> Dict[str, Any]:
+    async def _run_task(self, task_id: str) -> Dict[str, Any]:
         """
         Run a specific task
         
@@ -141,19 +250,22 @@ class AttackRunner:
         # Update target settings based on task configuration
         task_target = self.config_parser.get_target_for_task(task_id)
         
-        # Create a new context manager for this task
-        context_manager = ContextManager()
-        context_manager.set_attack_goal(task["goal"])
+        # Create a new context manager for this task, with its own context file
+        # since tasks may run concurrently
+        context_file = os.path.join(self.config_parser.get_output_dir(), f"context_{task_id}.json")
+        context_manager = ContextManager(context_file, load=False)
         
         task_start_time = time.time()
         
-        # Execute the task
-        results = run_attack_workflow(
+        # Execute the task; it waits on LLM and SSH calls without blocking the
+        # other tasks sharing the event loop
+        results = await arun_attack_workflow(
             goal=task["goal"],
             context_manager=context_manager,
             verbose=self.verbose,
             max_steps=max_steps
         )
+        await run_io(context_manager.close)
         
         task_duration = time.time() - task_start_time
         
@@ -163,7 +275,7 @@ class AttackRunner:
             "category": task.get("category", "uncategorized"),
             "goal": task.get("goal", "No goal specified"),
             "goal_reached": results.get("goal_reached", False),
-            "steps_executed": results.get("step_count", 0),
+            "steps_executed": results.get("steps_executed", 0),
             "max_steps": max_steps,
             "duration_seconds": task_duration,
             "vulnerabilities": results.get("vulnerabilities", []),
@@ -182,35 +294,24 @@ class AttackRunner:
         """
         task_results = self.results.get("tasks", {})
         
-        # Count tasks by category
-        categories = {}
+        # Count tasks, completions and vulnerabilities overall and by category in one pass
+        categories = {category: dict(counts) for category, counts in self._category_template.items()}
+        total_tasks = 0
+        completed_tasks = 0
+        total_vulnerabilities = 0
+        
         for task_id, result in task_results.items():
-            category = result.get("category", "uncategorized")
-            if category not in categories:
-                categories[category] = {
-                    "total": 0,
-                    "completed": 0,
-                    "vulnerabilities": 0
-                }
+            category = categories[self._task_categories[task_id]]
+            completed = bool(result.get("goal_reached", False))
+            vulnerabilities = len(result.get("vulnerabilities", ()))
             
-            categories[category]["total"] += 1
-            if result.get("goal_reached", False):
-                categories[category]["completed"] += 1
+            category["total"] += 1
+            category["completed"] += completed
+            category["vulnerabilities"] += vulnerabilities
             
-            categories[category]["vulnerabilities"] += len(result.get("vulnerabilities", []))
-        
-        # Count total vulnerabilities
-        total_vulnerabilities = sum(
-            len(result.get("vulnerabilities", [])) 
-            for result in task_results.values()
-        )
-        
-        # Calculate overall completion rate
-        total_tasks = len(task_results)
-        completed_tasks = sum(
-            1 for result in task_results.values() 
-            if result.get("goal_reached", False)
-        )
+            total_tasks += 1
+            completed_tasks += completed
+            total_vulnerabilities += vulnerabilities
         
         completion_rate = (completed_tasks / total_tasks) * 100 if total_tasks > 0 else 0
         
@@ -222,21 +323,43 @@ class AttackRunner:
             "categories": categories
         }
     
-    def _save_results(self, output_dir: str) -> None:
+    def _record_task_result(self, task_id: str) -> None:
         """
-        Save the results to a file
+        Append a finished task's result to the run's task results log
         
         Args:
-            output_dir: Directory to save the results to
+            task_id: ID of the finished task
         """
-        timestamp = datetime.now().strftime("%Y%m%d-%H%M%S")
-        filename = os.path.join(output_dir, f"attack_results_{timestamp}.json")
+        if self._task_log is None:
+            return
+        
+        try:
+            self._task_log.write(orjson.dumps({"task_id": task_id, "result": self.results["tasks"][task_id]}) + b"\n")
+            self._tasks_since_flush += 1
+            
+            # Push buffered results to disk every few tasks or seconds; the
+            # log is flushed completely when the run ends
+            if (self._tasks_since_flush >= TASK_LOG_FLUSH_EVERY
+                    or time.monotonic() - self._last_flush >= TASK_LOG_FLUSH_SECONDS):
+                self._task_log.flush()
+                self._tasks_since_flush = 0
+                self._last_flush = time.monotonic()
+        except Exception as e:
+            print(f"Error saving task result: {str(e)}")
+    
+    def _save_results(self) -> None:
+        """Save the complete results of the run and close its task results log"""
+        if self._task_log is not None:
+            self._task_log.close()
+            self._task_log = None
+        
+        filename = self._results_base + ".json"
         
         try:
-            with open(filename, "w") as f:
-                json.dump(self.results, f, indent=2)
+            with open(filename, "wb") as f:
+                f.write(orjson.dumps(self.results, option=orjson.OPT_INDENT_2))
                 
             if self.verbose:
                 print(f"Results saved to {filename}")
         except Exception as e:
-            print(f"Error saving results: {str(e)}")
\ No newline at end of file
+            print(f"Error saving results: {str(e)}")
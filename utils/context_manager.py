@@ -1,8 +1,12 @@
-import json
 import os
-from typing import Dict, List, Any, Optional
+from bisect import bisect_left
+from typing import Dict, List, Any, Optional, Tuple
 from datetime import datetime
-from config.settings import CONTEXT_FILE_PATH, MAX_CONTEXT_LENGTH
+
+import orjson
+import tiktoken
+
+from config.settings import CONTEXT_FILE_PATH, CONTEXT_FLUSH_EVERY, MAX_CONTEXT_LENGTH, EXTRACTOR_CHUNK_LENGTH, CONTEXT_TOKEN_KEEP, PLANNER_MODEL
 
 class ContextManager:
     """
@@ -10,50 +14,139 @@ class ContextManager:
     Stores and retrieves attack history, commands, and outputs.
     """
     
-    def __init__(self, context_file: str = CONTEXT_FILE_PATH):
+    def __init__(self, context_file: str = CONTEXT_FILE_PATH, load: bool = True):
         self.context_file = context_file
+        # The append-only step history lives next to the context file, one JSON object per line
+        self.history_file = os.path.splitext(context_file)[0] + ".history.jsonl"
+        self._history_fp = None
         self.attack_history = []
         self.attack_goal = ""
         self.current_plan = {}
         self.vulnerability_findings = []
-        self.load_context()
+        self._seen_vulnerabilities = set()
+        self._encoding = None
+        self._dirty = False
+        self._writes_since_flush = 0
+        self._plan_version = 0
+        self._reset_stable_prefix()
+        # Skip reading the previous context when the caller is about to start a new one
+        if load:
+            self.load_context()
         
     def load_context(self) -> None:
-        """Load context from the context file if it exists"""
+        """Load context from the context and history files if they exist"""
         if os.path.exists(self.context_file):
             try:
-                with open(self.context_file, 'r') as f:
-                    data = json.load(f)
-                    self.attack_history = data.get('attack_history', [])
+                with open(self.context_file, 'rb') as f:
+                    data = orjson.loads(f.read())
+                    if 'attack_history' in data:
+                        # Migrate context files written before the history moved out of them
+                        self.attack_history = data['attack_history']
+                        self._truncate_history()
+                        for step in self.attack_history:
+                            self._append_history(step)
+                        self._dirty = True
+                    else:
+                        self.attack_history = self._load_history()
                     self.attack_goal = data.get('attack_goal', "")
                     self.current_plan = data.get('current_plan', {})
                     self.vulnerability_findings = data.get('vulnerability_findings', [])
-            except (json.JSONDecodeError, IOError) as e:
+                    self._seen_vulnerabilities = {self._vulnerability_key(v) for v in self.vulnerability_findings}
+                    self._reset_stable_prefix()
+            except (orjson.JSONDecodeError, IOError) as e:
                 print(f"Error loading context file: {str(e)}")
     
+    def _load_history(self) -> List[Dict[str, Any]]:
+        """Read the attack history back from the history file"""
+        if not os.path.exists(self.history_file):
+            return []
+        
+        history = []
+        with open(self.history_file, 'rb') as f:
+            for line in f:
+                if line.strip():
+                    history.append(orjson.loads(line))
+        return history
+    
+    def _append_history(self, step_data: Dict[str, Any]) -> None:
+        """Append a single step to the history file"""
+        try:
+            if self._history_fp is None:
+                self._history_fp = open(self.history_file, 'ab')
+            self._history_fp.write(orjson.dumps(step_data) + b"\n")
+        except IOError as e:
+            print(f"Error saving history file: {str(e)}")
+    
+    def _truncate_history(self) -> None:
+        """Start a new, empty history file"""
+        if self._history_fp is not None:
+            self._history_fp.close()
+        try:
+            self._history_fp = open(self.history_file, 'wb')
+        except IOError as e:
+            self._history_fp = None
+            print(f"Error saving history file: {str(e)}")
+    
     def save_context(self) -> None:
-        """Save the current context to the context file"""
+        """
+        Mark the context as changed. Changes are batched and written to the
+        context file every CONTEXT_FLUSH_EVERY saves, or when flush() is called.
+        """
+        self._dirty = True
+        self._writes_since_flush += 1
+        if self._writes_since_flush >= CONTEXT_FLUSH_EVERY:
+            self.flush()
+    
+    def flush(self) -> None:
+        """Write pending history and context changes to disk"""
+        if self._history_fp is not None:
+            self._history_fp.flush()
+        
+        if not self._dirty:
+            return
+        
         data = {
             'attack_goal': self.attack_goal,
-            'attack_history': self.attack_history,
             'current_plan': self.current_plan,
             'vulnerability_findings': self.vulnerability_findings,
             'last_updated': datetime.now().isoformat()
         }
         
+        # Write to a temporary file first so a crash never leaves a truncated context file
+        tmp_file = self.context_file + ".tmp"
         try:
-            with open(self.context_file, 'w') as f:
-                json.dump(data, f, indent=2)
+            with open(tmp_file, 'wb') as f:
+                f.write(orjson.dumps(data))
+            os.replace(tmp_file, self.context_file)
+            self._dirty = False
+            self._writes_since_flush = 0
         except IOError as e:
             print(f"Error saving context file: {str(e)}")
     
+    def close(self) -> None:
+        """Flush pending changes and release the history file"""
+        self.flush()
+        if self._history_fp is not None:
+            self._history_fp.close()
+            self._history_fp = None
+    
     def set_attack_goal(self, goal: str) -> None:
         """Set the attack goal and initialize a new context"""
+        # Nothing to reset or write if this fresh context is already on disk
+        if (goal == self.attack_goal and not self.attack_history and not self.current_plan
+                and not self.vulnerability_findings and not self._dirty
+                and os.path.exists(self.context_file)):
+            return
+        
         self.attack_goal = goal
         self.attack_history = []
         self.current_plan = {}
         self.vulnerability_findings = []
+        self._seen_vulnerabilities = set()
+        self._reset_stable_prefix()
+        self._truncate_history()
         self.save_context()
+        self.flush()
     
     def add_attack_step(self, step_data: Dict[str, Any]) -> None:
         """
@@ -67,11 +160,12 @@ class ContextManager:
                 - timestamp: When this step was executed
         """
         self.attack_history.append(step_data)
-        self.save_context()
+        self._append_history(step_data)
     
     def set_current_plan(self, plan: Dict[str, Any]) -> None:
         """Set the current attack plan"""
         self.current_plan = plan
+        self._plan_version += 1
         self.save_context()
     
     def add_vulnerability(self, vulnerability: Dict[str, Any]) -> None:
@@ -86,45 +180,250 @@ class ContextManager:
                 - remediation: Suggested remediation steps
         """
         self.vulnerability_findings.append(vulnerability)
+        self._seen_vulnerabilities.add(self._vulnerability_key(vulnerability))
         self.save_context()
     
+    def add_vulnerabilities_bulk(self, vulnerabilities: List[Dict[str, Any]]) -> int:
+        """
+        Add several vulnerabilities at once, skipping ones already recorded
+        
+        Args:
+            vulnerabilities: Vulnerability dictionaries as accepted by add_vulnerability
+            
+        Returns:
+            The number of vulnerabilities actually added
+        """
+        new_findings = []
+        for vulnerability in vulnerabilities:
+            key = self._vulnerability_key(vulnerability)
+            if key not in self._seen_vulnerabilities:
+                self._seen_vulnerabilities.add(key)
+                new_findings.append(vulnerability)
+        
+        if new_findings:
+            self.vulnerability_findings.extend(new_findings)
+            self.save_context()
+        
+        return len(new_findings)
+    
+    @staticmethod
+    def _vulnerability_key(vulnerability: Dict[str, Any]) -> Tuple:
+        """
+        Identity of a vulnerability used for de-duplication: its type and evidence,
+        or all of its fields for findings without them, e.g. the workflow's
+        {"port", "service"} entries
+        """
+        if 'type' in vulnerability or 'evidence' in vulnerability:
+            return (str(vulnerability.get('type')), str(vulnerability.get('evidence')))
+        return tuple((key, str(value)) for key, value in sorted(vulnerability.items()))
+    
     def get_full_context(self) -> str:
         """
         Get the full context of the attack as a string.
         Includes attack goal, history, and current plan.
         """
-        context = f"ATTACK GOAL: {self.attack_goal}\n\n"
+        # The context only changes when a step is added or the plan or goal is
+        # replaced, so reuse the last rendering until then
+        key = (len(self.attack_history), self._plan_version)
+        if self._full_context is not None and self._full_context[0] == key:
+            return self._full_context[1]
+        
+        context = self._build_full_context()
+        self._full_context = (key, context)
+        return context
+    
+    def _build_full_context(self) -> str:
+        """Render the full context, truncated to MAX_CONTEXT_LENGTH"""
+        goal_part = f"ATTACK GOAL: {self.attack_goal}\n\n"
+        plan_part = self._render_plan()
+        steps = self._rendered_steps()
+        history_length = self._step_offsets[-1]
+        
+        if len(goal_part) + len("ATTACK HISTORY:\n") + history_length + len(plan_part) <= MAX_CONTEXT_LENGTH:
+            history_part = "ATTACK HISTORY:\n" + "".join(steps) if steps else ""
+            return goal_part + history_part + plan_part
+        
+        # Truncate to avoid exceeding model context limits: keep the goal and
+        # plan, plus as many of the most recent complete steps as fit. The step
+        # offsets give the first step that fits without touching the text.
+        remaining_length = MAX_CONTEXT_LENGTH - len(goal_part) - len(plan_part) - 50  # 50 chars buffer
+        first_kept = bisect_left(self._step_offsets, history_length - remaining_length)
+        recent_history = "".join(steps[first_kept:])
+        
+        # Always show at least the end of the newest step
+        if not recent_history and steps and remaining_length > 0:
+            recent_history = steps[-1][-remaining_length:]
+        
+        return goal_part + "[...Context truncated due to length...]\n\n" + recent_history + plan_part
+    
+    def get_full_context_cached(self) -> Tuple[str, str]:
+        """
+        Get the full context split into a stable prefix and an appended tail.
+        
+        The prefix holds the goal and every step except the newest one. It is
+        memoized and only ever extended by appending, so it stays byte-identical
+        across steps and can be served from a provider's prompt cache. The tail
+        holds the newest step and the current plan.
+        
+        Returns:
+            Tuple of (stable_prefix, appended_tail). If the context has to be
+            truncated, the prefix is empty and the tail is the truncated context.
+        """
+        settled_steps = max(len(self.attack_history) - 1, 0)
+        
+        if self._stable_steps > settled_steps:
+            self._reset_stable_prefix()
         
+        while self._stable_steps < settled_steps:
+            if self._stable_steps == 0:
+                self._stable_prefix += "ATTACK HISTORY:\n"
+            self._stable_prefix += self._render_step(self._stable_steps, self.attack_history[self._stable_steps])
+            self._stable_steps += 1
+        
+        tail = ""
         if self.attack_history:
-            context += "ATTACK HISTORY:\n"
-            for i, step in enumerate(self.attack_history):
-                context += f"--- Step {i+1} ---\n"
-                context += f"Plan: {step.get('plan', 'N/A')}\n"
-                context += f"Command: {step.get('command', 'N/A')}\n"
-                context += f"Output: {step.get('output', 'N/A')}\n\n"
-        
-        if self.current_plan:
-            context += "CURRENT PLAN:\n"
-            for i, step in enumerate(self.current_plan.get('steps', [])):
-                context += f"{i+1}. {step}\n"
-        
-        # Truncate if needed to avoid exceeding model context limits
-        if len(context) > MAX_CONTEXT_LENGTH:
-            # Keep the goal and trim the history
-            goal_part = context.split("\n\n")[0] + "\n\n"
-            remaining_length = MAX_CONTEXT_LENGTH - len(goal_part) - 50  # 50 chars buffer
+            if settled_steps == 0:
+                tail += "ATTACK HISTORY:\n"
+            tail += self._render_step(len(self.attack_history) - 1, self.attack_history[-1])
+        
+        tail += self._render_plan()
+        
+        if len(self._stable_prefix) + len(tail) > MAX_CONTEXT_LENGTH:
+            return "", self.get_full_context()
+        
+        return self._stable_prefix, tail
+    
+    @property
+    def encoding(self) -> "tiktoken.Encoding":
+        """Tokenizer of the planner model, loaded on first use"""
+        if self._encoding is None:
+            try:
+                self._encoding = tiktoken.encoding_for_model(PLANNER_MODEL)
+            except KeyError:
+                self._encoding = tiktoken.get_encoding("cl100k_base")
+        return self._encoding
+    
+    def count_tokens(self, text: str) -> int:
+        """
+        Count the tokens of a text with the planner model's tokenizer
+        
+        Args:
+            text: The text to measure
             
-            # Get the last part of the context that fits
-            trimmed_history = context[len(goal_part):][-remaining_length:]
+        Returns:
+            The number of tokens
+        """
+        return len(self.encoding.encode(text))
+    
+    def count_context_tokens(self) -> int:
+        """
+        Count the tokens of the whole context, before any MAX_CONTEXT_LENGTH
+        truncation. Each step rendering is encoded once, since the history is
+        append-only.
+        
+        Returns:
+            The number of tokens of the goal, every step and the current plan
+        """
+        steps = self._rendered_steps()
+        for rendered in steps[self._counted_steps:]:
+            self._history_tokens += self.count_tokens(rendered)
+        self._counted_steps = len(steps)
+        
+        header = f"ATTACK GOAL: {self.attack_goal}\n\n"
+        if steps:
+            header += "ATTACK HISTORY:\n"
+        return self.count_tokens(header) + self._history_tokens + self.count_tokens(self._render_plan())
+    
+    def get_windowed_context(self, keep_tokens: int = CONTEXT_TOKEN_KEEP) -> str:
+        """
+        Get the context reduced locally to a sliding window instead of summarizing it.
+        Keeps the goal and first step pinned, followed by the last keep_tokens tokens.
+        
+        Args:
+            keep_tokens: Number of tokens of recent history to keep
             
-            # Find the first complete step after trimming
-            first_step_idx = trimmed_history.find("--- Step ")
-            if first_step_idx > 0:
-                trimmed_history = trimmed_history[first_step_idx:]
+        Returns:
+            The windowed context string
+        """
+        pinned = f"ATTACK GOAL: {self.attack_goal}\n\n"
+        steps = self._rendered_steps()
+        
+        if steps:
+            pinned += "ATTACK HISTORY:\n" + steps[0]
+        recent = "".join(steps[1:]) + self._render_plan()
+        
+        tokens = self.encoding.encode(recent)
+        if len(tokens) > keep_tokens:
+            recent = "[...Context truncated due to length...]\n\n" + self.encoding.decode(tokens[-keep_tokens:])
+        
+        return pinned + recent
+    
+    def get_context_chunks(self, max_length: int = EXTRACTOR_CHUNK_LENGTH) -> List[str]:
+        """
+        Split the attack history into independent contexts on step boundaries
+        
+        Every chunk repeats the attack goal so it can be analyzed on its own.
+        A single step longer than max_length gets a chunk of its own.
+        
+        Args:
+            max_length: Target maximum length of a chunk in characters
             
-            context = goal_part + "[...Context truncated due to length...]\n\n" + trimmed_history
+        Returns:
+            List of context strings, at least one
+        """
+        header = f"ATTACK GOAL: {self.attack_goal}\n\nATTACK HISTORY:\n"
         
-        return context
+        chunks = []
+        current = header
+        for rendered in self._rendered_steps():
+            if current != header and len(current) + len(rendered) > max_length:
+                chunks.append(current)
+                current = header
+            current += rendered
+        
+        if current != header or not chunks:
+            chunks.append(current)
+        
+        return chunks
+    
+    def _rendered_steps(self) -> List[str]:
+        """
+        Get every attack step rendered as in the context. Renderings are
+        memoized and, since the history is append-only, only new steps are rendered.
+        _step_offsets[i] holds the total length of the first i renderings.
+        """
+        for i in range(len(self._rendered_history), len(self.attack_history)):
+            rendered = self._render_step(i, self.attack_history[i])
+            self._rendered_history.append(rendered)
+            self._step_offsets.append(self._step_offsets[-1] + len(rendered))
+        return self._rendered_history
+    
+    def _render_plan(self) -> str:
+        """Render the current plan the way it appears in the context"""
+        if not self.current_plan:
+            return ""
+        return "CURRENT PLAN:\n" + "".join(
+            f"{i+1}. {step}\n" for i, step in enumerate(self.current_plan.get('steps', []))
+        )
+    
+    def _render_step(self, index: int, step: Dict[str, Any]) -> str:
+        """Render a single attack step the way it appears in the context"""
+        return (
+            f"--- Step {index+1} ---\n"
+            f"Plan: {step.get('plan', 'N/A')}\n"
+            f"Command: {step.get('command', 'N/A')}\n"
+            f"Output: {step.get('output', 'N/A')}\n\n"
+        )
+    
+    def _reset_stable_prefix(self) -> None:
+        """Drop the memoized context prefix and step renderings, e.g. after the goal changed"""
+        self._stable_prefix = f"ATTACK GOAL: {self.attack_goal}\n\n"
+        self._stable_steps = 0
+        self._rendered_history = []
+        self._step_offsets = [0]
+        self._counted_steps = 0
+        self._history_tokens = 0
+        self._full_context = None
     
     def get_summarized_context(self, summary: str) -> str:
         """
@@ -139,10 +438,7 @@ class ContextManager:
         context = f"ATTACK GOAL: {self.attack_goal}\n\n"
         context += f"ATTACK HISTORY SUMMARY:\n{summary}\n\n"
         
-        if self.current_plan:
-            context += "CURRENT PLAN:\n"
-            for i, step in enumerate(self.current_plan.get('steps', [])):
-                context += f"{i+1}. {step}\n"
+        context += self._render_plan()
         
         return context
     
@@ -152,4 +448,8 @@ class ContextManager:
         self.attack_goal = ""
         self.current_plan = {}
         self.vulnerability_findings = []
-        self.save_context()
\ No newline at end of file
+        self._seen_vulnerabilities = set()
+        self._reset_stable_prefix()
+        self._truncate_history()
+        self.save_context()
+        self.flush()
@@ -0,0 +1,53 @@
+"""
+IO Executor
+
+Shared thread pools for the blocking file writes and SSH commands issued from
+async code, so they overlap with orchestration instead of stalling the event loop.
+SSH gets its own pool, sized to the number of concurrent attacks, so slow remote
+commands never queue behind file writes or each other.
+"""
+
+import atexit
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, TypeVar
+
+from config.settings import IO_MAX_WORKERS, SSH_MAX_WORKERS
+
+T = TypeVar("T")
+
+IO_EXECUTOR = ThreadPoolExecutor(max_workers=IO_MAX_WORKERS, thread_name_prefix="sec-agent-io")
+atexit.register(IO_EXECUTOR.shutdown, wait=True)
+
+SSH_EXECUTOR = ThreadPoolExecutor(max_workers=SSH_MAX_WORKERS, thread_name_prefix="sec-agent-ssh")
+atexit.register(SSH_EXECUTOR.shutdown, wait=True)
+
+
+async def run_io(func: Callable[..., T], *args: Any) -> T:
+    """
+    Run a blocking function on the shared IO thread pool
+    
+    Args:
+        func: The blocking function
+        *args: Positional arguments for func
+        
+    Returns:
+        The function's return value
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(IO_EXECUTOR, func, *args)
+
+
+async def run_ssh(func: Callable[..., T], *args: Any) -> T:
+    """
+    Run a blocking SSH connect or command on the SSH thread pool
+    
+    Args:
+        func: The blocking function
+        *args: Positional arguments for func
+        
+    Returns:
+        The function's return value
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(SSH_EXECUTOR, func, *args)
@@ -0,0 +1,35 @@
+"""
+JSON Extraction
+
+Helpers for pulling a JSON object out of a raw model response, which may be
+wrapped in a Markdown code fence.
+"""
+
+import re
+import orjson
+from typing import Dict, Any, Optional
+
+# Matches the body of a ``` or ```json code fence
+JSON_FENCE_RE = re.compile(r"```(?:json)?\s*(.*?)```", re.S)
+
+
+def extract_json(content: str) -> Optional[Dict[str, Any]]:
+    """
+    Extract a JSON object from a model response
+    
+    Args:
+        content: The raw model response
+        
+    Returns:
+        The parsed object, or None if the response does not contain a JSON object
+    """
+    match = JSON_FENCE_RE.search(content)
+    if match:
+        content = match.group(1)
+    
+    try:
+        data = orjson.loads(content)
+    except orjson.JSONDecodeError:
+        return None
+    
+    return data if isinstance(data, dict) else None
@@ -0,0 +1,102 @@
+"""
+Plan Cache
+
+A persistent cache of planner output, so a goal that was already planned in an
+earlier run, from exactly the same context, against the same target with the
+same model, reuses that plan instead of making another planner call.
+"""
+
+import atexit
+import hashlib
+import os
+import sqlite3
+import threading
+from functools import lru_cache
+from typing import Dict, Any, Optional
+
+import orjson
+
+from config.settings import PLAN_CACHE_PATH, PLANNER_MODEL, SSH_HOST
+
+
+class PlanCache:
+    """SQLite-backed cache of plans keyed by a fingerprint of the model, target, goal and context"""
+    
+    def __init__(self, path: str = PLAN_CACHE_PATH):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("CREATE TABLE IF NOT EXISTS plans (key BLOB PRIMARY KEY, plan BLOB NOT NULL)")
+        self._conn.commit()
+        self._lock = threading.Lock()
+    
+    @staticmethod
+    def _normalize(text: str) -> str:
+        return " ".join(text.lower().split())
+    
+    def make_key(self, kind: str, goal: str, context: str) -> bytes:
+        """
+        Build a cache key from the planner model, the target, the goal and the whole context
+        
+        Args:
+            kind: Which planner produced the plan, since plan shapes differ
+            goal: The attack goal
+            context: The attack context the plan is generated from
+            
+        Returns:
+            A SHA-256 digest of the model, target, normalized goal and normalized context
+        """
+        digest = hashlib.sha256()
+        for part in (kind, PLANNER_MODEL, SSH_HOST, self._normalize(goal), self._normalize(context)):
+            digest.update(part.encode('utf-8'))
+            digest.update(b"\0")
+        return digest.digest()
+    
+    def get(self, kind: str, goal: str, context: str) -> Optional[Dict[str, Any]]:
+        """
+        Look up a cached plan
+        
+        Args:
+            kind: Which planner produced the plan
+            goal: The attack goal
+            context: The attack context the plan is generated from
+            
+        Returns:
+            The cached plan, or None on a miss
+        """
+        key = self.make_key(kind, goal, context)
+        with self._lock:
+            row = self._conn.execute("SELECT plan FROM plans WHERE key = ?", (key,)).fetchone()
+        return orjson.loads(row[0]) if row else None
+    
+    def put(self, kind: str, goal: str, context: str, plan: Dict[str, Any]) -> None:
+        """
+        Store a plan. Plans that declare the goal reached are not kept, so a
+        later run always checks the goal again instead of replaying the claim.
+        
+        Args:
+            kind: Which planner produced the plan
+            goal: The attack goal
+            context: The attack context the plan was generated from
+            plan: The parsed plan
+        """
+        if plan.get("goal_reached"):
+            return
+        key = self.make_key(kind, goal, context)
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO plans (key, plan) VALUES (?, ?)", (key, orjson.dumps(plan)))
+            self._conn.commit()
+    
+    def close(self) -> None:
+        """Close the database connection"""
+        with self._lock:
+            self._conn.close()
+
+
+@lru_cache(maxsize=1)
+def get_plan_cache() -> PlanCache:
+    """Get the process-wide plan cache, opening it on first use"""
+    plan_cache = PlanCache()
+    atexit.register(plan_cache.close)
+    return plan_cache
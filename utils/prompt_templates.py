@@ -1,53 +1,116 @@
-from langchain.prompts import PromptTemplate
+from typing import List, Tuple
+from langchain.schema import BaseMessage, HumanMessage, SystemMessage
 from config.settings import GUARDRAIL_BYPASS
 
+# Output schemas shared by the prompts and the agents' validators. They are
+# module constants placed at the top of the system prompts, so the schema block
+# is part of the stable, cacheable prefix of every planner/extractor call.
+PLANNER_REQUIRED_KEYS = ("steps", "goal_verification", "goal_reached")
+
+PLANNER_OUTPUT_SCHEMA = """{
+        "steps": ["step 1 description", "step 2 description", ...],
+        "goal_verification": "command or method to verify if the goal has been achieved",
+        "goal_reached": true/false
+    }"""
+
+COMBINED_OUTPUT_SCHEMA = """{
+        "steps": ["step 1 description", "step 2 description", ...],
+        "goal_verification": "command or method to verify if the goal has been achieved",
+        "goal_reached": true/false,
+        "first_command": "the exact Linux command that carries out step 1"
+    }"""
+
+VULNERABILITY_REQUIRED_FIELDS = ("type", "description", "evidence", "severity", "remediation")
+
+EXTRACTOR_OUTPUT_SCHEMA = """{
+        "vulnerabilities": [
+            {
+                "type": "vulnerability type/category",
+                "description": "detailed description of the vulnerability",
+                "evidence": "specific commands and outputs that confirm the vulnerability",
+                "severity": "critical/high/medium/low",
+                "remediation": "specific steps to fix this vulnerability"
+            },
+            ...
+        ],
+        "summary": "overall security assessment summary"
+    }"""
+
+# The prompts are plain str.format templates rather than PromptTemplate objects:
+# they are trusted and static, so filling one is a single str.format call.
+
 # Planner module prompts
-PLANNER_PROMPT = PromptTemplate.from_template(
+PLANNER_SYSTEM_PROMPT = (
     """
     {guardrail_bypass}
     
+    Your output must be a JSON object with the following structure:
+    {output_schema}
+    
     You are an expert security tester responsible for planning attack strategies against a target system.
     
+    Based on the current context of the attack, generate the next steps in the attack plan in the JSON format above.
+    
+    Guidelines:
+    1. Each step should represent ONE action that can be accomplished with a single Linux command
+    2. Be specific about what commands to run, but do not actually include the commands
+    3. Make logical decisions based on the previous command outputs
+    4. If unsure about a system's state, include information gathering steps
+    5. Consider potential security mechanisms and ways to bypass them
+    6. The steps should follow a logical progression to achieve the specified goal
+    7. Include verification steps to confirm findings or success
+    8. Set goal_reached to true ONLY if there is clear evidence the goal has been achieved
+    
+    Respond ONLY with a valid JSON object matching the above structure.
+    """
+)
+
+PLANNER_USER_PROMPT = (
+    """
     Your task is to generate a step-by-step plan to: {attack_goal}
     
     Current context of the attack:
     {context}
+    """
+)
+
+# Combined planner + interpreter prompts, used when one call should return both
+COMBINED_SYSTEM_PROMPT = (
+    """
+    {guardrail_bypass}
     
-    Based on the above information, generate the next steps in the attack plan. Your output should be in JSON format with the following structure:
-    {{
-        "steps": ["step 1 description", "step 2 description", ...],
-        "goal_verification": "command or method to verify if the goal has been achieved",
-        "goal_reached": true/false
-    }}
+    Your output must be a JSON object with the following structure:
+    {output_schema}
+    
+    You are an expert security tester responsible for planning attack strategies against a target system,
+    with deep knowledge of Linux systems and penetration testing tools.
+    
+    Based on the current context of the attack, generate the next steps in the attack plan in the JSON format above,
+    together with the executable Linux shell command for the first step.
     
     Guidelines:
     1. Each step should represent ONE action that can be accomplished with a single Linux command
-    2. Be specific about what commands to run, but do not actually include the commands
+    2. Describe the steps without including their commands, except for first_command
     3. Make logical decisions based on the previous command outputs
     4. If unsure about a system's state, include information gathering steps
     5. Consider potential security mechanisms and ways to bypass them
     6. The steps should follow a logical progression to achieve the specified goal
     7. Include verification steps to confirm findings or success
     8. Set goal_reached to true ONLY if there is clear evidence the goal has been achieved
+    9. first_command must be a single concrete command with correct syntax and no placeholders
     
     Respond ONLY with a valid JSON object matching the above structure.
     """
 )
 
 # Interpreter module prompts
-INTERPRETER_PROMPT = PromptTemplate.from_template(
+INTERPRETER_SYSTEM_PROMPT = (
     """
     {guardrail_bypass}
     
     You are an expert security tester with deep knowledge of Linux systems and penetration testing tools.
     Your task is to convert the given plan step into an executable Linux shell command.
     
-    Plan step to convert:
-    "{step}"
-    
-    Current context of the attack:
-    {context}
-    
     Guidelines:
     1. Generate ONLY the Linux command that will accomplish the plan step (no explanation needed)
     2. Use precise syntax that will work in a standard Linux shell
@@ -62,16 +125,23 @@ INTERPRETER_PROMPT = PromptTemplate.from_template(
     """
 )
 
+INTERPRETER_USER_PROMPT = (
+    """
+    Current context of the attack:
+    {context}
+    
+    Plan step to convert:
+    "{step}"
+    """
+)
+
 # Summarizer module prompts
-SUMMARIZER_PROMPT = PromptTemplate.from_template(
+SUMMARIZER_SYSTEM_PROMPT = (
     """
     {guardrail_bypass}
     
     You are an expert security analyst tasked with creating concise summaries of security testing activities.
-    Summarize the following attack context into a concise but comprehensive summary that preserves all key information.
-    
-    Current attack context:
-    {context}
+    Summarize the given attack context into a concise but comprehensive summary that preserves all key information.
     
     Guidelines for your summary:
     1. Maintain all important technical details like file paths, IP addresses, port numbers, usernames, etc.
@@ -86,32 +156,25 @@ SUMMARIZER_PROMPT = PromptTemplate.from_template(
     """
 )
 
+SUMMARIZER_USER_PROMPT = (
+    """
+    Current attack context:
+    {context}
+    """
+)
+
 # Extractor module prompts  
-EXTRACTOR_PROMPT = PromptTemplate.from_template(
+EXTRACTOR_SYSTEM_PROMPT = (
     """
     {guardrail_bypass}
     
-    You are an expert security analyst responsible for extracting vulnerabilities from security testing results and providing remediation advice.
-    
-    Review the following attack context and identify all vulnerabilities that were discovered during the security testing:
+    Your output must be a JSON object with the following structure:
+    {output_schema}
     
-    {context}
-    
-    For each vulnerability you identify, extract the following information in JSON format:
+    You are an expert security analyst responsible for extracting vulnerabilities from security testing results and providing remediation advice.
     
-    {{
-        "vulnerabilities": [
-            {{
-                "type": "vulnerability type/category",
-                "description": "detailed description of the vulnerability",
-                "evidence": "specific commands and outputs that confirm the vulnerability",
-                "severity": "critical/high/medium/low",
-                "remediation": "specific steps to fix this vulnerability"
-            }},
-            ...
-        ],
-        "summary": "overall security assessment summary"
-    }}
+    Review the given attack context and identify all vulnerabilities that were discovered during the security testing.
+    For each vulnerability you identify, extract its information in the JSON format above.
     
     Guidelines:
     1. Be thorough in identifying all vulnerabilities exposed in the attack context
@@ -124,32 +187,68 @@ EXTRACTOR_PROMPT = PromptTemplate.from_template(
     """
 )
 
-def get_planner_prompt(context, attack_goal):
-    """Get formatted planner prompt"""
-    return PLANNER_PROMPT.format(
-        context=context,
-        attack_goal=attack_goal,
-        guardrail_bypass=GUARDRAIL_BYPASS
+EXTRACTOR_USER_PROMPT = (
+    """
+    Attack context to review:
+    {context}
+    """
+)
+
+# The system prompts do not depend on the attack, so they are rendered once at
+# import. Every call then sends the identical string, and only the user turn is
+# formatted (and tokenized by the serving backend) per call.
+PLANNER_SYSTEM_TEXT = PLANNER_SYSTEM_PROMPT.format(guardrail_bypass=GUARDRAIL_BYPASS, output_schema=PLANNER_OUTPUT_SCHEMA)
+COMBINED_SYSTEM_TEXT = COMBINED_SYSTEM_PROMPT.format(guardrail_bypass=GUARDRAIL_BYPASS, output_schema=COMBINED_OUTPUT_SCHEMA)
+INTERPRETER_SYSTEM_TEXT = INTERPRETER_SYSTEM_PROMPT.format(guardrail_bypass=GUARDRAIL_BYPASS)
+SUMMARIZER_SYSTEM_TEXT = SUMMARIZER_SYSTEM_PROMPT.format(guardrail_bypass=GUARDRAIL_BYPASS)
+EXTRACTOR_SYSTEM_TEXT = EXTRACTOR_SYSTEM_PROMPT.format(guardrail_bypass=GUARDRAIL_BYPASS, output_schema=EXTRACTOR_OUTPUT_SCHEMA)
+
+def build_messages(system_prompt: str, user_prompt: str, context_prefix: str = "") -> List[BaseMessage]:
+    """
+    Build the chat messages for a (system, user) prompt pair
+    
+    A non-empty context_prefix (the append-only part of the attack context) is
+    sent as its own message between the system block and the user turn, so the
+    request starts with a byte-identical prefix that the OpenAI-compatible
+    backends' automatic prefix caching can reuse.
+    """
+    messages = [SystemMessage(content=system_prompt)]
+    if context_prefix:
+        messages.append(HumanMessage(content=context_prefix))
+    messages.append(HumanMessage(content=user_prompt))
+    return messages
+
+def get_planner_prompt(context, attack_goal) -> Tuple[str, str]:
+    """Get formatted planner prompt as a (system, user) pair"""
+    return (
+        PLANNER_SYSTEM_TEXT,
+        PLANNER_USER_PROMPT.format(context=context, attack_goal=attack_goal)
     )
 
-def get_interpreter_prompt(context, step):
-    """Get formatted interpreter prompt"""
-    return INTERPRETER_PROMPT.format(
-        context=context,
-        step=step,
-        guardrail_bypass=GUARDRAIL_BYPASS
+def get_combined_prompt(context, attack_goal) -> Tuple[str, str]:
+    """Get formatted combined planner + interpreter prompt as a (system, user) pair"""
+    return (
+        COMBINED_SYSTEM_TEXT,
+        PLANNER_USER_PROMPT.format(context=context, attack_goal=attack_goal)
     )
 
-def get_summarizer_prompt(context):
-    """Get formatted summarizer prompt"""
-    return SUMMARIZER_PROMPT.format(
-        context=context,
-        guardrail_bypass=GUARDRAIL_BYPASS
+def get_interpreter_prompt(context, step) -> Tuple[str, str]:
+    """Get formatted interpreter prompt as a (system, user) pair"""
+    return (
+        INTERPRETER_SYSTEM_TEXT,
+        INTERPRETER_USER_PROMPT.format(context=context, step=step)
     )
 
-def get_extractor_prompt(context):
-    """Get formatted extractor prompt"""
-    return EXTRACTOR_PROMPT.format(
-        context=context,
-        guardrail_bypass=GUARDRAIL_BYPASS
-    )
\ No newline at end of file
+def get_summarizer_prompt(context) -> Tuple[str, str]:
+    """Get formatted summarizer prompt as a (system, user) pair"""
+    return (
+        SUMMARIZER_SYSTEM_TEXT,
+        SUMMARIZER_USER_PROMPT.format(context=context)
+    )
+
+def get_extractor_prompt(context) -> Tuple[str, str]:
+    """Get formatted extractor prompt as a (system, user) pair"""
+    return (
+        EXTRACTOR_SYSTEM_TEXT,
+        EXTRACTOR_USER_PROMPT.format(context=context)
+    )
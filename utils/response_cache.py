@@ -0,0 +1,74 @@
+"""
+Response Cache
+
+A small thread-safe LRU cache for parsed agent responses, so a repeated
+prompt is answered locally instead of with another model round-trip.
+"""
+
+import copy
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, Optional
+
+from config.settings import RESPONSE_CACHE_SIZE
+
+
+class ResponseCache:
+    """LRU cache of parsed agent responses keyed by a digest of the prompt inputs"""
+    
+    def __init__(self, maxsize: int = RESPONSE_CACHE_SIZE):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+    
+    @staticmethod
+    def make_key(*parts: str) -> bytes:
+        """
+        Build a cache key from the prompt inputs
+        
+        Args:
+            parts: The strings that determine the response
+            
+        Returns:
+            A 16-byte BLAKE2b digest of the parts
+        """
+        digest = hashlib.blake2b(digest_size=16)
+        for part in parts:
+            digest.update(part.encode('utf-8'))
+            digest.update(b"\0")
+        return digest.digest()
+    
+    def get(self, key: bytes) -> Optional[Dict[str, Any]]:
+        """
+        Look up a cached response
+        
+        Args:
+            key: Key built with make_key
+            
+        Returns:
+            A copy of the cached response, or None on a miss
+        """
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                return None
+            self._entries.move_to_end(key)
+        return copy.deepcopy(value)
+    
+    def put(self, key: bytes, value: Dict[str, Any]) -> None:
+        """
+        Store a response, evicting the least recently used one if the cache is full
+        
+        Args:
+            key: Key built with make_key
+            value: The parsed response
+        """
+        if self.maxsize <= 0:
+            return
+        value = copy.deepcopy(value)
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
@@ -1,93 +1,130 @@
+import atexit
+import asyncio
+import threading
 import paramiko
 import time
+import uuid
+import select
 import socket
+import queue
 import logging
-from typing import Tuple, Optional, Dict, Any
-from config.settings import SSH_HOST, SSH_PORT, SSH_USERNAME, SSH_PASSWORD, SSH_KEY_PATH, SSH_OPTIONS
+import logging.handlers
+from contextlib import contextmanager, asynccontextmanager
+from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor
+from typing import Tuple, Optional, Dict, Any, Iterator, AsyncIterator, List
+from utils.io_executor import SSH_EXECUTOR, run_ssh
+from config.settings import SSH_HOST, SSH_PORT, SSH_USERNAME, SSH_PASSWORD, SSH_KEY_PATH, SSH_OPTIONS, SSH_KEEPALIVE_INTERVAL, SSH_USE_SHELL, SSH_RECV_CHUNK, SSH_MAX_SESSIONS
 
-# Set up logging
-logging.basicConfig(level=logging.INFO, 
-                    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-                    filename='ssh_client.log',
-                    filemode='a')
+# Set up logging. Records are handed to a queue and written to the log file by
+# a background listener thread, so logging never blocks a command on file I/O.
+def _setup_logging() -> None:
+    root = logging.getLogger()
+    if root.handlers:
+        return
+    file_handler = logging.FileHandler('ssh_client.log', mode='a')
+    file_handler.setFormatter(logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s'))
+    log_queue = queue.SimpleQueue()
+    listener = logging.handlers.QueueListener(log_queue, file_handler)
+    listener.start()
+    atexit.register(listener.stop)
+    root.addHandler(logging.handlers.QueueHandler(log_queue))
+    root.setLevel(logging.INFO)
+
+_setup_logging()
 logger = logging.getLogger('SSHClient')
 
+
+@lru_cache(maxsize=8)
+def _parse_ssh_options(options: str) -> Dict[str, Any]:
+    """
+    Parse an SSH options string into a paramiko configuration dictionary.
+    Options may be given as "-o Key=Value", "-oKey=Value" or "Key=Value".
+    The result is cached per options string and must not be modified.
+    
+    Args:
+        options: The SSH options string
+        
+    Returns:
+        Dictionary of SSH options for paramiko
+    """
+    ssh_config = {}
+    
+    if not options:
+        return ssh_config
+    
+    logger.debug("Parsing SSH options: %s", options)
+        
+    for option in options.strip().split():
+        if option == "-o":
+            continue
+        if option.startswith("-o"):
+            # Remove the -o prefix
+            option = option[2:]
+        if "=" in option:
+            key, value = option.split("=", 1)
+            logger.debug("Processing SSH option: %s=%s", key, value)
+            
+            # Handle HostKeyAlgorithms option
+            if key == "HostKeyAlgorithms" and value.startswith("+"):
+                # Add algorithms to the default list
+                value = value[1:]  # Remove the + sign
+                logger.info("Adding key algorithms: %s", value)
+                
+                # For ssh-rsa specifically: legacy servers only understand
+                # SHA-1 RSA signatures, so stop paramiko from offering the
+                # rsa-sha2 variants ahead of ssh-rsa
+                if "ssh-rsa" in value:
+                    logger.info("Enabling ssh-rsa support")
+                    ssh_config["allow_agent"] = False
+                    ssh_config["disabled_algorithms"] = {"pubkeys": ["rsa-sha2-512", "rsa-sha2-256"]}
+                            
+    logger.debug("Parsed SSH config: %s", ssh_config)
+    return ssh_config
+
+
 class SSHClient:
     """SSH client for connecting to and executing commands on remote systems"""
     
     def __init__(self, host=SSH_HOST, port=SSH_PORT, username=SSH_USERNAME, 
-                 password=SSH_PASSWORD, key_path=SSH_KEY_PATH, options=SSH_OPTIONS):
+                 password=SSH_PASSWORD, key_path=SSH_KEY_PATH, options=SSH_OPTIONS,
+                 use_shell=SSH_USE_SHELL, recv_chunk=SSH_RECV_CHUNK,
+                 keepalive_interval=SSH_KEEPALIVE_INTERVAL, max_sessions=SSH_MAX_SESSIONS):
         self.host = host
         self.port = port
         self.username = username
         self.password = password
         self.key_path = key_path
         self.options = options or ""
+        self.use_shell = use_shell
+        self.recv_chunk = recv_chunk
+        self.keepalive_interval = keepalive_interval
+        self._sessions = threading.BoundedSemaphore(max_sessions)
+        # Options are parsed once per options string, not on every (re)connect
+        self._ssh_config = _parse_ssh_options(self.options)
         self.client = None
         self.shell = None
+        self._executor = None
         
         # Log initialization with connection details
-        logger.info(f"Initializing SSH client for {username}@{host}:{port}")
-        logger.info(f"Using SSH options: {self.options}")
-        
-    def _parse_ssh_options(self) -> Dict[str, Any]:
-        """
-        Parse SSH options string into paramiko configuration dictionary
-        
-        Returns:
-            Dictionary of SSH options for paramiko
-        """
-        ssh_config = {}
-        
-        if not self.options:
-            return ssh_config
-        
-        logger.debug(f"Parsing SSH options: {self.options}")
-            
-        options = self.options.strip().split()
-        for option in options:
-            if option.startswith("-o"):
-                # Remove the -o prefix
-                option = option[2:]
-                if "=" in option:
-                    key, value = option.split("=", 1)
-                    logger.debug(f"Processing SSH option: {key}={value}")
-                    
-                    # Handle HostKeyAlgorithms option
-                    if key == "HostKeyAlgorithms":
-                        if value.startswith("+"):
-                            # Add algorithms to the default list
-                            value = value[1:]  # Remove the + sign
-                            logger.info(f"Adding key algorithms: {value}")
-                            ssh_config["disabled_algorithms"] = {"pubkeys": []}
-                            
-                            # For ssh-rsa specifically
-                            if "ssh-rsa" in value:
-                                logger.info("Enabling ssh-rsa support")
-                                ssh_config["allow_agent"] = False
-                                # Tell paramiko to accept ssh-rsa keys
-                                transport = paramiko.Transport((self.host, self.port))
-                                transport.get_security_options().key_types = ['ssh-rsa'] + list(transport.get_security_options().key_types)
-                                
-        logger.debug(f"Parsed SSH config: {ssh_config}")
-        return ssh_config
+        logger.info("Initializing SSH client for %s@%s:%s", username, host, port)
+        logger.info("Using SSH options: %s", self.options)
         
     def connect(self) -> bool:
         """
-        Establish an SSH connection and create an interactive shell
+        Establish an SSH connection, and an interactive shell if use_shell is set
         
         Returns:
             bool: True if connection was successful, False otherwise
         """
-        logger.info(f"Attempting to connect to {self.host}:{self.port} as {self.username}")
+        logger.info("Attempting to connect to %s:%s as %s", self.host, self.port, self.username)
         
         try:
             self.client = paramiko.SSHClient()
             self.client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
             logger.debug("Created SSH client with AutoAddPolicy for host keys")
             
-            # Parse any custom SSH options
-            ssh_config = self._parse_ssh_options()
+            ssh_config = self._ssh_config
             
             connect_kwargs = {
                 'hostname': self.host,
@@ -102,43 +139,42 @@ class SSHClient:
             
             if self.key_path:
                 # Use key-based authentication if a key path is provided
-                logger.info(f"Using key-based authentication with key: {self.key_path}")
+                logger.info("Using key-based authentication with key: %s", self.key_path)
                 connect_kwargs['key_filename'] = self.key_path
             else:
                 # Use password authentication
                 logger.info("Using password authentication")
                 connect_kwargs['password'] = self.password
             
-            # Handle ssh-rsa specifically
-            if self.options and "HostKeyAlgorithms=+ssh-rsa" in self.options:
-                # Configure paramiko to accept ssh-rsa keys
-                logger.info("Configuring paramiko to prioritize ssh-rsa keys")
-                paramiko.Transport._preferred_pubkeys = ['ssh-rsa'] + [
-                    k for k in paramiko.Transport._preferred_pubkeys if k != 'ssh-rsa'
-                ]
-            
-            logger.debug(f"Connection parameters: {connect_kwargs}")
             self.client.connect(**connect_kwargs)
-            logger.info(f"Successfully connected to {self.host}")
+            logger.info("Successfully connected to %s", self.host)
+            
+            # Keep the single transport alive between steps instead of reconnecting
+            if self.keepalive_interval:
+                self.client.get_transport().set_keepalive(self.keepalive_interval)
+            
+            if not self.use_shell:
+                return True
             
             # Create interactive shell session
             logger.debug("Invoking shell")
             self.shell = self.client.invoke_shell()
             
-            # Wait for shell to initialize
-            time.sleep(1)
-            
-            # Clear initial output
-            if self.shell.recv_ready():
-                initial_output = self.shell.recv(4096).decode('utf-8', errors='ignore')
-                logger.debug(f"Initial shell output: {initial_output}")
+            # Wait up to a second for the banner/prompt instead of always sleeping,
+            # then clear whatever initial output has arrived
+            readable, _, _ = select.select([self.shell], [], [], 1.0)
+            if readable:
+                initial_output = bytearray()
+                while self.shell.recv_ready():
+                    initial_output += self.shell.recv(self.recv_chunk)
+                logger.debug("Initial shell output: %s", initial_output.decode('utf-8', errors='ignore'))
                 
             logger.info("SSH shell session established successfully")
             return True
         
         except (paramiko.AuthenticationException, paramiko.SSHException, 
                 socket.error, Exception) as e:
-            logger.error(f"SSH connection error: {str(e)}")
+            logger.error("SSH connection error: %s", e)
             print(f"SSH connection error: {str(e)}")
             return False
     
@@ -146,6 +182,114 @@ class SSHClient:
         """
         Execute a command on the remote system
         
+        Args:
+            command: The command to execute
+            timeout: Maximum time to wait for output (seconds)
+            
+        Returns:
+            Tuple containing (output, error_message)
+        """
+        if self.use_shell:
+            return self._execute_in_shell(command, timeout)
+        
+        if not self.is_active():
+            logger.error("No active SSH connection")
+            return "", "No active SSH connection"
+        
+        try:
+            transport = self.client.get_transport()
+            # Log the command being executed
+            logger.info("Executing command: %s", command)
+            start_time = time.time()
+            
+            # Run the command on its own channel; stderr is merged into the
+            # output as it would be on a terminal. Channels are capped at the
+            # server's session limit so concurrent tasks queue instead of failing.
+            with self._sessions:
+                channel = transport.open_session(timeout=timeout)
+                channel.set_combine_stderr(True)
+                channel.exec_command(command)
+                
+                # Block until data arrives or the command exits instead of polling
+                chunks = []
+                deadline = start_time + timeout
+                while True:
+                    remaining = deadline - time.time()
+                    if remaining <= 0:
+                        logger.warning("Command timed out after %s seconds", timeout)
+                        break
+                    readable, _, _ = select.select([channel], [], [], remaining)
+                    if readable:
+                        chunk = channel.recv(self.recv_chunk)
+                        if not chunk:
+                            break
+                        chunks.append(chunk)
+                        # Take everything already buffered before waiting again
+                        while channel.recv_ready():
+                            chunks.append(channel.recv(self.recv_chunk))
+                exit_status = channel.recv_exit_status() if channel.exit_status_ready() else None
+                channel.close()
+            
+            output = b"".join(chunks).decode('utf-8', errors='ignore')
+            
+            # Log a truncated version of the output (to avoid huge log files)
+            if logger.isEnabledFor(logging.DEBUG):
+                log_output = output[:500] + "..." if len(output) > 500 else output
+                logger.debug("Command output: %s", log_output)
+            
+            elapsed_time = time.time() - start_time
+            logger.info("Command completed in %.2f seconds (exit status %s)", elapsed_time, exit_status)
+            
+            return output, None
+                
+        except Exception as e:
+            error_msg = f"Command execution error: {str(e)}"
+            logger.error(error_msg)
+            return "", error_msg
+    
+    def execute_commands(self, commands: List[str], timeout: int = 30) -> Tuple[List[str], Optional[str]]:
+        """
+        Execute several commands in one round-trip, one after another, and
+        split the combined output back into per-command outputs
+        
+        Args:
+            commands: The commands to execute, in order
+            timeout: Maximum time to wait for each command's output (seconds)
+            
+        Returns:
+            Tuple containing (outputs, error_message), with one output per command
+        """
+        # Each command is followed by an echoed marker; the quotes keep the
+        # marker text out of the command line itself
+        token = uuid.uuid4().hex[:12]
+        payload = "\n".join(f'{command}\necho "__STEP_""{token}_{i}__"' for i, command in enumerate(commands))
+        output, error = self.execute_command(payload, timeout * len(commands))
+        
+        # A command whose marker never arrived (e.g. on timeout) gets whatever
+        # output is left, and the commands after it get none. A pty ends the
+        # marker line with \r\n rather than \n.
+        outputs = []
+        pos = 0
+        for i in range(len(commands)):
+            marker = f"__STEP_{token}_{i}__"
+            end = output.find(marker, pos)
+            if end == -1:
+                outputs.append(output[pos:])
+                pos = len(output)
+            else:
+                outputs.append(output[pos:end])
+                pos = end + len(marker)
+                if output.startswith("\r\n", pos):
+                    pos += 2
+                elif output.startswith("\n", pos):
+                    pos += 1
+        return outputs, error
+    
+    def _execute_in_shell(self, command: str, timeout: int = 30) -> Tuple[str, Optional[str]]:
+        """
+        Execute a command in the interactive shell, which keeps state such as
+        the working directory between commands
+        
         Args:
             command: The command to execute
             timeout: Maximum time to wait for output (seconds)
@@ -159,33 +303,49 @@ class SSHClient:
         
         try:
             # Log the command being executed
-            logger.info(f"Executing command: {command}")
+            logger.info("Executing command: %s", command)
             
-            # Send command to the shell
-            self.shell.send(command + "\n")
+            # Send the command followed by an end marker. The quotes split the
+            # marker in the echoed command line, so only the echo's output matches it.
+            token = uuid.uuid4().hex[:12]
+            sentinel = f"__DONE_{token}__".encode()
+            self.shell.send(f'{command}; echo "__DONE_""{token}__"\n')
             
-            # Wait for output
-            output = ""
+            # Block until data arrives instead of polling, and stop at the marker
+            buffer = bytearray()
             start_time = time.time()
+            deadline = start_time + timeout
             
-            while (time.time() - start_time) < timeout:
-                if self.shell.recv_ready():
-                    chunk = self.shell.recv(4096).decode('utf-8', errors='ignore')
-                    output += chunk
-                    
-                    # If we see a shell prompt, we're likely done
-                    if "$" in chunk or "#" in chunk or ">" in chunk:
-                        if not self.shell.recv_ready():
-                            break
-                
-                time.sleep(0.1)
+            while True:
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    logger.warning("Command timed out after %s seconds", timeout)
+                    break
+                readable, _, _ = select.select([self.shell], [], [], remaining)
+                if not readable:
+                    continue
+                chunk = self.shell.recv(self.recv_chunk)
+                if not chunk:
+                    break
+                search_from = max(0, len(buffer) - len(sentinel))
+                buffer += chunk
+                # Take everything already buffered before looking for the marker
+                while self.shell.recv_ready():
+                    buffer += self.shell.recv(self.recv_chunk)
+                marker = buffer.find(sentinel, search_from)
+                if marker != -1:
+                    del buffer[marker:]
+                    break
+            
+            output = buffer.decode('utf-8', errors='ignore')
             
             # Log a truncated version of the output (to avoid huge log files)
-            log_output = output[:500] + "..." if len(output) > 500 else output
-            logger.debug(f"Command output: {log_output}")
+            if logger.isEnabledFor(logging.DEBUG):
+                log_output = output[:500] + "..." if len(output) > 500 else output
+                logger.debug("Command output: %s", log_output)
             
             elapsed_time = time.time() - start_time
-            logger.info(f"Command completed in {elapsed_time:.2f} seconds")
+            logger.info("Command completed in %.2f seconds", elapsed_time)
             
             return output, None
                 
@@ -194,11 +354,200 @@ class SSHClient:
             logger.error(error_msg)
             return "", error_msg
     
+    async def execute_command_async(self, command: str, timeout: int = 30) -> Tuple[str, Optional[str]]:
+        """
+        Execute a command on the remote system without blocking the event loop
+        
+        Args:
+            command: The command to execute
+            timeout: Maximum time to wait for output (seconds)
+            
+        Returns:
+            Tuple containing (output, error_message)
+        """
+        if not self.use_shell:
+            # Exec channels are independent, so commands can share the SSH pool
+            return await run_ssh(self.execute_command, command, timeout)
+        
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._get_executor(), self.execute_command, command, timeout)
+    
+    async def execute_commands_async(self, commands: List[str], timeout: int = 30) -> Tuple[List[str], Optional[str]]:
+        """
+        Execute several commands in one round-trip without blocking the event loop
+        
+        Args:
+            commands: The commands to execute, in order
+            timeout: Maximum time to wait for each command's output (seconds)
+            
+        Returns:
+            Tuple containing (outputs, error_message), with one output per command
+        """
+        if not self.use_shell:
+            return await run_ssh(self.execute_commands, commands, timeout)
+        
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._get_executor(), self.execute_commands, commands, timeout)
+    
+    def _get_executor(self) -> ThreadPoolExecutor:
+        """
+        Get the background thread that runs commands on the interactive shell.
+        A single worker keeps commands on the shared channel strictly ordered.
+        """
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="ssh-command")
+        return self._executor
+    
+    def is_active(self, probe: bool = False) -> bool:
+        """
+        Whether the SSH connection is still up
+        
+        Args:
+            probe: Also send an SSH ignore message, so a connection that was
+                silently dropped (e.g. by a NAT idle timeout) is detected now
+                rather than by the next command
+            
+        Returns:
+            bool: True if the connection is usable
+        """
+        transport = self.client.get_transport() if self.client else None
+        if not (transport and transport.is_active()):
+            return False
+        if probe:
+            try:
+                transport.send_ignore()
+            except (paramiko.SSHException, socket.error, EOFError):
+                return False
+        return True
+    
     def close(self):
         """Close the SSH connection"""
         logger.info("Closing SSH connection")
+        if self._executor:
+            self._executor.shutdown(wait=False)
+            self._executor = None
         if self.shell:
             self.shell.close()
         if self.client:
             self.client.close()
-        logger.info("SSH connection closed")
\ No newline at end of file
+        logger.info("SSH connection closed")
+
+
+class SSHClientPool:
+    """
+    Connected SSH clients shared per target and connection settings. In exec
+    mode commands run on independent channels, so concurrent tasks can share
+    one transport instead of each paying for a new SSH handshake. In shell mode
+    (SSH_USE_SHELL) the borrowers share one shell, with its working directory
+    and environment, and their commands run one at a time.
+    """
+    
+    def __init__(self):
+        self._clients: Dict[Tuple, SSHClient] = {}
+        self._lock = threading.Lock()
+    
+    def get(self, host=SSH_HOST, port=SSH_PORT, username=SSH_USERNAME,
+            password=SSH_PASSWORD, key_path=SSH_KEY_PATH, options=SSH_OPTIONS,
+            use_shell=SSH_USE_SHELL) -> Optional[SSHClient]:
+        """
+        Get a connected client for the target, reconnecting if the pooled one dropped
+        
+        Returns:
+            The connected SSHClient, or None if the connection failed
+        """
+        key = (host, port, username, password, key_path, options, use_shell)
+        with self._lock:
+            client = self._clients.get(key)
+            if client is not None:
+                if client.is_active(probe=True):
+                    return client
+                logger.info("Pooled SSH connection to %s:%s dropped, reconnecting", host, port)
+                client.close()
+                del self._clients[key]
+            
+            client = SSHClient(host, port, username, password, key_path, options, use_shell=use_shell)
+            if not client.connect():
+                return None
+            self._clients[key] = client
+            return client
+    
+    @contextmanager
+    def borrow(self, host=SSH_HOST, port=SSH_PORT, username=SSH_USERNAME,
+               password=SSH_PASSWORD, key_path=SSH_KEY_PATH, options=SSH_OPTIONS,
+               use_shell=SSH_USE_SHELL) -> Iterator[Optional[SSHClient]]:
+        """
+        Borrow the pooled client for the target for the duration of a with block.
+        The client stays shared; on release it is dropped from the pool if its
+        connection died, so the next borrower reconnects.
+        
+        Yields:
+            The connected SSHClient, or None if the connection failed
+        """
+        client = self.get(host, port, username, password, key_path, options, use_shell)
+        try:
+            yield client
+        finally:
+            if client is not None and not client.is_active():
+                self.discard(client)
+    
+    @asynccontextmanager
+    async def aborrow(self, host=SSH_HOST, port=SSH_PORT, username=SSH_USERNAME,
+                      password=SSH_PASSWORD, key_path=SSH_KEY_PATH, options=SSH_OPTIONS,
+                      use_shell=SSH_USE_SHELL) -> AsyncIterator[Optional[SSHClient]]:
+        """
+        Like borrow(), but connects (or waits for a connect already in
+        progress) on the SSH pool instead of blocking the event loop
+        
+        Yields:
+            The connected SSHClient, or None if the connection failed
+        """
+        client = await run_ssh(self.get, host, port, username, password, key_path, options, use_shell)
+        try:
+            yield client
+        finally:
+            if client is not None and not client.is_active():
+                self.discard(client)
+    
+    def prewarm(self) -> None:
+        """Start connecting to the default target in the background"""
+        SSH_EXECUTOR.submit(self.get)
+    
+    def discard(self, client: SSHClient) -> None:
+        """
+        Close a client and remove it from the pool
+        
+        Args:
+            client: The pooled client to drop
+        """
+        with self._lock:
+            key = next((key for key, pooled in self._clients.items() if pooled is client), None)
+            if key is None:
+                # Already dropped (and closed) by another borrower
+                return
+            del self._clients[key]
+        client.close()
+    
+    def reconnect(self, client: SSHClient) -> Optional[SSHClient]:
+        """
+        Replace a pooled client whose connection died with a fresh one
+        
+        Args:
+            client: The dead client
+            
+        Returns:
+            The new connected SSHClient, or None if the connection failed
+        """
+        self.discard(client)
+        return self.get(client.host, client.port, client.username,
+                        client.password, client.key_path, client.options, client.use_shell)
+    
+    def close_all(self) -> None:
+        """Close every pooled connection"""
+        with self._lock:
+            for client in self._clients.values():
+                client.close()
+            self._clients.clear()
+
+
+ssh_pool = SSHClientPool()
+atexit.register(ssh_pool.close_all)
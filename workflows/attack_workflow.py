@@ -1,211 +1,509 @@
 from typing import Dict, Any, List, Tuple, TypedDict, Annotated, Union, Literal, Optional
 from datetime import datetime
+import asyncio
 import json
+import logging
+import os
+import re
+import tempfile
+import time
+from functools import lru_cache
+
+import tiktoken
 
 from langgraph.graph import StateGraph, END
 from langchain.globals import set_llm_cache
-from langchain_community.cache import InMemoryCache
+from langchain_community.cache import InMemoryCache, SQLiteCache
 from pydantic import BaseModel, Field
 
-from config.settings import MAX_ATTACK_STEPS, USE_SUMMARIZER
+from config.settings import MAX_ATTACK_STEPS, USE_SUMMARIZER, STEP_BATCH_SIZE, STEP_OUTPUT_SPILL_CHARS, STEP_OUTPUT_DIR, CONTEXT_FILE_PATH, MAX_CONCURRENT_ATTACKS
+from config.settings import PLANNER_MODEL, CONTEXT_TOKEN_BUDGET, LLM_CACHE_PATH
 from agents.planner import PlannerAgent
 from agents.interpreter import InterpreterAgent
 from agents.summarizer import SummarizerAgent
-from agents.extractor import ExtractorAgent
-from utils.ssh_client import SSHClient
+from utils.ssh_client import ssh_pool
 from utils.context_manager import ContextManager
+from utils.io_executor import run_io, run_ssh
+
+logger = logging.getLogger(__name__)
+
+# A port line of nmap's service scan, e.g. "22/tcp open  ssh  OpenSSH 8.9p1"
+_NMAP_RE = re.compile(r"^[^\S\n]*(\d+/(?:tcp|udp))[^\S\n]+\S+[^\S\n]+(.+)$", re.MULTILINE)
+
+# Share of CONTEXT_TOKEN_BUDGET at which the context is summarized
+SUMMARIZE_BUDGET_FRACTION = 0.8
+# Steps kept after the goal when the context has to be cut to a sliding window
+WINDOW_KEEP_STEPS = 3
+# Steps that must pass after a summarizer call before it is called again
+SUMMARIZE_MIN_STEPS = 5
+# Failed executions in a row after which the attack is given up
+MAX_CONSECUTIVE_ERRORS = 3
+# Graph nodes run per step (interpret, execute, update_history, summarize,
+# select_next, and plan when replanning), and the few run once per attack
+NODES_PER_STEP = 6
+NODES_PER_ATTACK = 20
+
+def append_history(history: List[Dict[str, Any]], new_entries: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """State reducer that returns a new list, leaving the caller's and checkpointed lists untouched"""
+    return history + new_entries
 
 class AttackState(TypedDict):
     goal: str
-    context: str
+    # The context is kept as the list of chunks appended so far plus their total
+    # token count, and joined only when an agent needs it as one string
+    context_chunks: List[str]
+    context_tokens: int
+    # step_count at the last summarizer call, None before the first
+    last_summary_step: Optional[int]
     current_plan: Dict[str, Any]
+    # The current plan's steps, and the index of current_step in them
+    plan_steps: List[str]
+    plan_index: int
     current_step: str
     step_command: str
     step_output: str
-    history: List[Dict[str, Any]]
+    step_commands: List[str]
+    step_outputs: List[str]
+    # Speculative translation of the plan's next step, made while the last command ran
+    prefetched_step: str
+    prefetched_command: str
+    # Files holding the full output of the last executed command(s), "" if not spilled
+    step_output_paths: List[str]
+    # Nodes return only the new history entries; the reducer appends them.
+    # Steps are capped at max_steps, so the copy per step stays small.
+    history: Annotated[List[Dict[str, Any]], append_history]
     vulnerabilities: List[Dict[str, Any]]
+    # Port -> service found by the service scans run so far, the latest scan winning
+    service_index: Dict[str, str]
     step_count: int
+    # Executions that failed in a row, reset by a successful one
+    consecutive_errors: int
     goal_reached: bool
     error: str
     max_steps: Optional[int]
 
+# Agents hold their model clients and response caches, so each is created on
+# first use and shared by every workflow step and attack
+@lru_cache(maxsize=1)
+def get_planner() -> PlannerAgent:
+    return PlannerAgent()
+
+@lru_cache(maxsize=1)
+def get_interpreter() -> InterpreterAgent:
+    return InterpreterAgent()
+
+@lru_cache(maxsize=1)
+def get_summarizer() -> SummarizerAgent:
+    return SummarizerAgent()
+
+@lru_cache(maxsize=1)
+def get_encoding() -> "tiktoken.Encoding":
+    """Tokenizer of the planner model, loaded on first use"""
+    try:
+        return tiktoken.encoding_for_model(PLANNER_MODEL)
+    except KeyError:
+        return tiktoken.get_encoding("cl100k_base")
+
+def count_tokens(text: str) -> int:
+    return len(get_encoding().encode(text))
+
+@lru_cache(maxsize=1)
+def get_llm_cache() -> Union[SQLiteCache, InMemoryCache]:
+    """Open the LangChain response cache once, persistent if LLM_CACHE_PATH is set"""
+    if not LLM_CACHE_PATH:
+        return InMemoryCache()
+    directory = os.path.dirname(LLM_CACHE_PATH)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    return SQLiteCache(database_path=LLM_CACHE_PATH)
+
+def get_context(state: AttackState) -> str:
+    """Join the context chunks into the string the agents are prompted with"""
+    return "".join(state["context_chunks"])
+
+def get_context_parts(state: AttackState) -> Tuple[str, str]:
+    """
+    Split the context into a stable prefix and the newest chunk
+    
+    Chunks are only appended between summarizations, so the prefix is only
+    ever extended and can be served from a provider's prompt cache when it
+    is passed to the agents as context_prefix.
+    
+    Returns:
+        Tuple of (stable_prefix, newest_chunk)
+    """
+    chunks = state["context_chunks"]
+    if not chunks:
+        return "", ""
+    return "".join(chunks[:-1]), chunks[-1]
+
+# The nodes that wait on the LLM or the target are coroutines, so concurrent
+# workflows interleave on one event loop instead of each blocking a thread.
+# Nodes return only the keys they change, which LangGraph merges into the state.
+
 def initialize_attack(state: AttackState) -> AttackState:
     """Initialize a new attack with the specified goal"""
-    ssh_client = SSHClient()
+    # Connect in the background while the first plan is generated; the pooled
+    # connection is reused by every step, and a failed connect is reported by
+    # the first execute step
+    ssh_pool.prewarm()
     
-    if not ssh_client.connect():
-        return {**state, "error": "Failed to establish SSH connection"}
-    
-    ssh_client.close()
+    goal_context = f"ATTACK GOAL: {state['goal']}\n\n"
     return {
-        **state,
-        "context": f"ATTACK GOAL: {state['goal']}\n\n",
+        "context_chunks": [goal_context],
+        "context_tokens": count_tokens(goal_context),
+        "last_summary_step": None,
         "current_plan": {},
+        "plan_steps": [],
+        "plan_index": 0,
         "current_step": "",
         "step_command": "",
         "step_output": "",
-        "history": [],
+        "step_commands": [],
+        "step_outputs": [],
+        "step_output_paths": [],
+        "prefetched_step": "",
+        "prefetched_command": "",
         "vulnerabilities": [],
+        "service_index": {},
         "step_count": 0,
+        "consecutive_errors": 0,
         "goal_reached": False,
         "error": ""
     }
 
-def plan_attack(state: AttackState) -> AttackState:
+async def plan_attack(state: AttackState) -> AttackState:
     """Generate an attack plan using the planner agent"""
-    planner = PlannerAgent()
+    planner = get_planner()
     
-    plan = planner.invoke(state["context"], state["goal"])
+    context_prefix, context = get_context_parts(state)
+    plan = await planner.ainvoke(context, state["goal"], context_prefix)
     return {
-        **state,
         "current_plan": plan,
+        "plan_steps": plan.get("steps") or [],
+        "plan_index": 0,
         "current_step": plan["steps"][0] if plan.get("steps") else "",
         "goal_reached": plan.get("goal_reached", False)
     }
 
-def interpret_step(state: AttackState) -> AttackState:
+async def interpret_step(state: AttackState) -> AttackState:
     """Convert the current step to an executable command"""
-    interpreter = InterpreterAgent()
+    interpreter = get_interpreter()
     
     if not state["current_step"]:
-        return {**state, "error": "No step to interpret"}
+        return {"error": "No step to interpret", "step_commands": []}
+    
+    # With batching enabled, interpret the next queued steps together so they
+    # can be sent to the target in one round-trip
+    effective_max_steps = state.get("max_steps") or MAX_ATTACK_STEPS
+    batch_size = min(STEP_BATCH_SIZE, effective_max_steps - state["step_count"])
+    start = state["plan_index"]
+    steps = state["plan_steps"][start:start + batch_size]
+    context_prefix, context = get_context_parts(state)
+    if len(steps) < 2:
+        if state["prefetched_command"] and state["prefetched_step"] == state["current_step"]:
+            command = state["prefetched_command"]
+        else:
+            command = await interpreter.ainvoke(context, state["current_step"], context_prefix, state["goal"])
+        return {"step_command": command, "step_commands": [], "prefetched_step": "", "prefetched_command": ""}
     
-    command = interpreter.invoke(state["context"], state["current_step"])
+    commands = await asyncio.gather(*(interpreter.ainvoke(context, step, context_prefix, state["goal"]) for step in steps))
     return {
-        **state,
-        "step_command": command
+        "step_command": commands[0],
+        "step_commands": list(commands)
     }
 
-def execute_command(state: AttackState) -> AttackState:
-    """Execute the command on the target system"""
-    ssh_client = SSHClient()
+def spill_outputs(outputs: List[str]) -> Tuple[List[str], List[str]]:
+    """
+    Write command outputs longer than STEP_OUTPUT_SPILL_CHARS to files, so the
+    state and the prompts only carry their head and tail
     
+    Args:
+        outputs: The command outputs
+        
+    Returns:
+        Tuple containing (outputs as kept in the state, paths of the full outputs or "")
+    """
+    kept, paths = [], []
+    for output in outputs:
+        if not STEP_OUTPUT_SPILL_CHARS or len(output) <= STEP_OUTPUT_SPILL_CHARS:
+            kept.append(output)
+            paths.append("")
+            continue
+        fd, path = tempfile.mkstemp(prefix="attack_step_", suffix=".out", dir=STEP_OUTPUT_DIR or None)
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(output)
+        kept.append(f"{output[:2048]}\n...[truncated, full output at {path}]...\n{output[-2048:]}")
+        paths.append(path)
+    return kept, paths
+
+async def execute_command(state: AttackState) -> AttackState:
+    """Execute the command on the target system"""
     if not state["step_command"]:
-        return {**state, "error": "No command to execute"}
-    if not ssh_client.connect():
-        return {**state, "error": "Failed to establish SSH connection"}
+        return {"error": "No command to execute", "step_output_paths": [], "consecutive_errors": state["consecutive_errors"] + 1}
     
-    output, error = ssh_client.execute_command(state["step_command"])
-    ssh_client.close()
+    async with ssh_pool.aborrow() as ssh_client:
+        if ssh_client is None:
+            return {"error": "Failed to establish SSH connection", "step_output_paths": [], "consecutive_errors": state["consecutive_errors"] + 1}
+        
+        if state["step_commands"]:
+            outputs, error = await ssh_client.execute_commands_async(state["step_commands"])
+            if error and not ssh_client.is_active():
+                # The pooled connection dropped; reconnect once and retry
+                ssh_client = await run_ssh(ssh_pool.reconnect, ssh_client)
+                if ssh_client is not None:
+                    outputs, error = await ssh_client.execute_commands_async(state["step_commands"])
+            if error:
+                outputs = [f"Error: {error}"] * len(state["step_commands"])
+                return {"step_output": outputs[0], "step_outputs": outputs, "step_output_paths": [], "error": error,
+                        "consecutive_errors": state["consecutive_errors"] + 1}
+            outputs, paths = await run_io(spill_outputs, outputs)
+            return {"step_output": outputs[0], "step_outputs": outputs, "step_output_paths": paths, "consecutive_errors": 0}
+        
+        async def run_command() -> Tuple[str, Optional[str]]:
+            client = ssh_client
+            output, error = await client.execute_command_async(state["step_command"])
+            if error and not client.is_active():
+                # The pooled connection dropped; reconnect once and retry
+                client = await run_ssh(ssh_pool.reconnect, client)
+                if client is not None:
+                    output, error = await client.execute_command_async(state["step_command"])
+            return output, error
+        
+        # The plan is likely to continue with the step after this one, so
+        # translate it while the command runs. It is only reused if it matches,
+        # and skipped when this is the last step the budget allows.
+        next_index = state["plan_index"] + 1
+        next_step = state["plan_steps"][next_index] if next_index < len(state["plan_steps"]) else ""
+        if state["step_count"] + 1 >= (state.get("max_steps") or MAX_ATTACK_STEPS):
+            next_step = ""
+        prefetched = {}
+        if next_step:
+            context_prefix, context = get_context_parts(state)
+            # A failed speculation must not cost the real command's output
+            command_result, next_command = await asyncio.gather(
+                run_command(),
+                get_interpreter().ainvoke(context, next_step, context_prefix, state["goal"]),
+                return_exceptions=True
+            )
+            if isinstance(command_result, BaseException):
+                raise command_result
+            output, error = command_result
+            if isinstance(next_command, BaseException):
+                logger.warning("Prefetching the command for the next step failed: %s", next_command)
+            else:
+                prefetched = {"prefetched_step": next_step, "prefetched_command": next_command}
+        else:
+            output, error = await run_command()
     
     if error:
-        return {**state, "step_output": f"Error: {error}", "error": error}
+        return {"step_output": f"Error: {error}", "step_output_paths": [], "error": error,
+                "consecutive_errors": state["consecutive_errors"] + 1, **prefetched}
+    outputs, paths = await run_io(spill_outputs, [output])
     return {
-        **state,
-        "step_output": output
+        "step_output": outputs[0],
+        "step_output_paths": paths,
+        "consecutive_errors": 0,
+        **prefetched
     }
 
 def update_history(state: AttackState) -> AttackState:
     """Update the attack history with the latest step"""
-    step_data = {
-        "command": state["step_command"],
-        "output": state["step_output"],
-        "plan": state["current_step"],
-        "timestamp": datetime.now().isoformat()
-    }
+    if state["step_commands"]:
+        # A batch records one step per command it ran
+        start = state["plan_index"]
+        steps = state["plan_steps"][start:start + len(state["step_commands"])]
+        executed = list(zip(steps, state["step_commands"], state["step_outputs"]))
+    else:
+        executed = [(state["current_step"], state["step_command"], state["step_output"])]
+    
+    # Steps carry a raw clock reading; it is formatted once when results are returned
+    ts_ns = time.time_ns()
+    new_history = []
+    for (step, command, output), path in zip(executed, state["step_output_paths"] or [""] * len(executed)):
+        step_data = {"command": command, "output": output, "plan": step, "ts_ns": ts_ns}
+        if path:
+            step_data["output_path"] = path
+        new_history.append(step_data)
     
-    updated_history = state["history"] + [step_data]
-    step_context = f"--- Step {state['step_count'] + 1} ---\n"
-    step_context += f"Plan: {state['current_step']}\n"
-    step_context += f"Command: {state['step_command']}\n"
-    step_context += f"Output: {state['step_output']}\n\n"
+    service_index = state["service_index"]
+    for step_data in new_history:
+        if is_service_scan(step_data["command"]):
+            service_index = {**service_index, **parse_services(step_data["output"], step_data.get("output_path", ""))}
     
-    updated_context = state["context"] + step_context
+    step_context = ""
+    for i, (step, command, output) in enumerate(executed, state["step_count"] + 1):
+        step_context += f"--- Step {i} ---\n"
+        step_context += f"Plan: {step}\n"
+        step_context += f"Command: {command}\n"
+        step_context += f"Output: {output}\n\n"
     
-    step_count = state["step_count"] + 1
+    step_count = state["step_count"] + len(executed)
     
     return {
-        **state,
-        "history": updated_history,
-        "context": updated_context,
+        "history": new_history,
+        "context_chunks": state["context_chunks"] + [step_context],
+        "context_tokens": state["context_tokens"] + count_tokens(step_context),
+        "service_index": service_index,
         "step_count": step_count
     }
 
-def summarize_context(state: AttackState) -> AttackState:
+async def summarize_context(state: AttackState) -> AttackState:
     """Summarize the context if it's getting too large"""
-    if not USE_SUMMARIZER:
-        return state
+    # Summarize as the context nears the token budget, and cut it to a sliding
+    # window only if the summary is still over budget or cannot be made
+    summarize_at = int(CONTEXT_TOKEN_BUDGET * SUMMARIZE_BUDGET_FRACTION)
+    if state["context_tokens"] <= summarize_at:
+        return {}
+    
+    remaining_steps = state["plan_steps"][state["plan_index"]:]
+    plan_context = ""
+    if remaining_steps:
+        plan_context = "CURRENT PLAN:\n"
+        for i, step in enumerate(remaining_steps):
+            plan_context += f"{i+1}. {step}\n"
     
-    if len(state["context"]) < 8000:
-        return state
+    # A summary that could not shrink the context enough is not retried every
+    # step; the sliding window keeps the context in budget in the meantime
+    last_summary_step = state["last_summary_step"]
+    cooling_down = last_summary_step is not None and state["step_count"] - last_summary_step < SUMMARIZE_MIN_STEPS
     
-    summarizer = SummarizerAgent()
-    summary = summarizer.invoke(state["context"])
+    update = {}
+    if USE_SUMMARIZER and not cooling_down:
+        update["last_summary_step"] = state["step_count"]
+        summarizer = get_summarizer()
+        summary = await summarizer.ainvoke(get_context(state))
+        
+        summarized_context = f"ATTACK GOAL: {state['goal']}\n\n"
+        summarized_context += f"ATTACK HISTORY SUMMARY:\n{summary}\n\n"
+        summarized_context += plan_context
+        
+        summarized_tokens = count_tokens(summarized_context)
+        if summarized_tokens <= CONTEXT_TOKEN_BUDGET:
+            return {
+                "context_chunks": [summarized_context],
+                "context_tokens": summarized_tokens,
+                **update
+            }
+    elif state["context_tokens"] <= CONTEXT_TOKEN_BUDGET:
+        return {}
     
-    summarized_context = f"ATTACK GOAL: {state['goal']}\n\n"
-    summarized_context += f"ATTACK HISTORY SUMMARY:\n{summary}\n\n"
+    # The summary did not shrink the context enough, or there is no summarizer:
+    # keep only the goal and the last few steps
+    windowed_context = f"ATTACK GOAL: {state['goal']}\n\n"
+    windowed_context += "ATTACK HISTORY:\n[...Earlier steps dropped due to length...]\n\n"
+    recent = state["history"][-WINDOW_KEEP_STEPS:]
+    for i, entry in enumerate(recent, state["step_count"] - len(recent) + 1):
+        windowed_context += f"--- Step {i} ---\n"
+        windowed_context += f"Plan: {entry['plan']}\n"
+        windowed_context += f"Command: {entry['command']}\n"
+        windowed_context += f"Output: {entry['output']}\n\n"
+    windowed_context += plan_context
     
-    if state["current_plan"].get("steps"):
-        summarized_context += "CURRENT PLAN:\n"
-        for i, step in enumerate(state["current_plan"]["steps"]):
-            summarized_context += f"{i+1}. {step}\n"
+    return {
+        "context_chunks": [windowed_context],
+        "context_tokens": count_tokens(windowed_context),
+        **update
+    }
+
+def is_service_scan(command: str) -> bool:
+    """Whether a command is an nmap service/version scan"""
+    return "nmap" in command and "-sV" in command
+
+def parse_services(output: str, output_path: str = "") -> Dict[str, str]:
+    """
+    Parse the open ports and service versions out of nmap -sV output
     
+    Args:
+        output: The command output as kept in the history
+        output_path: File holding the full output if it was spilled
+        
+    Returns:
+        Dictionary mapping each port to its service description
+    """
+    # Long outputs are only kept as head/tail in the history; scan the full file
+    if output_path:
+        try:
+            with open(output_path, encoding="utf-8") as f:
+                output = f.read()
+        except OSError:
+            pass
     return {
-        **state,
-        "context": summarized_context
+        match.group(1): " ".join(match.group(2).split())
+        for match in _NMAP_RE.finditer(output)
     }
 
 def analyze_history_for_services(history):
     """
     Analyze command history to find open ports and service versions
     """
-    services = []
-
+    services = {}
     for entry in history:
-        cmd = entry.get("command", "")
-        output = entry.get("output", "")
-
-        if "nmap" in cmd and "-sV" in cmd:
-            lines = output.splitlines()
-            for line in lines:
-                if "/tcp" in line or "/udp" in line:
-                    parts = line.strip().split()
-                    if len(parts) >= 3:
-                        port_info = parts[0]
-                        service_info = " ".join(parts[2:])
-                        services.append({
-                            "port": port_info,
-                            "service": service_info
-                        })
-
-    return services
+        if is_service_scan(entry.get("command", "")):
+            services.update(parse_services(entry.get("output", ""), entry.get("output_path", "")))
+    return [{"port": port, "service": service} for port, service in services.items()]
     
 def extract_vulnerabilities(state: AttackState) -> AttackState:
     """Extract vulnerabilities from attack history"""
-    found_services = analyze_history_for_services(state["history"])
+    # Service scans are parsed once, as update_history records them
+    found_services = [{"port": port, "service": service} for port, service in state["service_index"].items()]
     
-    state["vulnerabilities"] = found_services
-    state["goal_reached"] = True
+    return {
+        "vulnerabilities": found_services,
+        "goal_reached": True
+    }
+
+def format_history(history: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Convert the steps' raw ts_ns clock readings into ISO timestamps for the results
     
-    return state
+    Args:
+        history: Step records as built by update_history
+        
+    Returns:
+        The step records with a "timestamp" field instead of "ts_ns"
+    """
+    formatted = []
+    for step in history:
+        step = dict(step)
+        ts_ns = step.pop("ts_ns", None)
+        if ts_ns is not None:
+            step["timestamp"] = datetime.fromtimestamp(ts_ns / 1e9).isoformat()
+        formatted.append(step)
+    return formatted
 
 def should_continue(state: AttackState) -> Union[Literal["continue"], Literal["finish"]]:
     effective_max_steps = state.get("max_steps") or MAX_ATTACK_STEPS
     
-    print(f"[DEBUG] Step Count: {state['step_count']}, Goal Reached: {state['goal_reached']}, Max Steps: {effective_max_steps}")
+    logger.debug("Step Count: %s, Goal Reached: %s, Max Steps: %s", state["step_count"], state["goal_reached"], effective_max_steps)
     
     if state["goal_reached"]:
-        print("[DEBUG] Goal reached, finishing.")
+        logger.debug("Goal reached, finishing.")
         return "finish"
     if state["step_count"] >= effective_max_steps:
-        print(f"[DEBUG] Max steps ({effective_max_steps}) reached, finishing.")
+        logger.debug("Max steps (%s) reached, finishing.", effective_max_steps)
         return "finish"
     if state["error"] and "SSH" in state["error"]:
-        print("[DEBUG] SSH error, finishing.")
+        logger.debug("SSH error, finishing.")
+        return "finish"
+    if state["consecutive_errors"] >= MAX_CONSECUTIVE_ERRORS:
+        logger.debug("%s consecutive errors, finishing.", state["consecutive_errors"])
         return "finish"
-    print("[DEBUG] Continuing...")
+    logger.debug("Continuing...")
     return "continue"
 
 def select_next_step(state: AttackState) -> AttackState:
     """Select the next step from the current plan"""
-    if not state["current_plan"].get("steps"):
-        return {**state, "error": "No steps in the current plan"}
+    steps = state["plan_steps"]
+    if not steps:
+        return {"error": "No steps in the current plan"}
     
-    steps = state["current_plan"]["steps"]
+    # Advance the cursor past the step (or batch) just run instead of slicing the plan
+    plan_index = state["plan_index"] + max(len(state["step_commands"]), 1)
     
-    if len(steps) <= 1:
-        return {**state, "current_step": ""}
-    return {**state, "current_step": steps[1], "current_plan": {**state["current_plan"], "steps": steps[1:]}}
+    if plan_index >= len(steps):
+        return {"current_step": ""}
+    return {"current_step": steps[plan_index], "plan_index": plan_index}
 
 def create_attack_workflow() -> StateGraph:
     """Create the attack workflow graph using LangGraph"""
@@ -249,6 +547,11 @@ def create_attack_workflow() -> StateGraph:
     
     return workflow
 
+@lru_cache(maxsize=1)
+def _get_app():
+    """Compile the attack workflow graph once and reuse it for every attack"""
+    return create_attack_workflow().compile()
+
 def run_attack_workflow(
     goal: str,
     context_manager: Optional[ContextManager] = None,
@@ -256,7 +559,7 @@ def run_attack_workflow(
     max_steps: Optional[int] = None
 ) -> Dict[str, Any]:
     """
-    Run the attack workflow with the specified goal
+    Run the attack workflow with the specified goal, blocking until it finishes
     
     Args:
         goal: The attack goal
@@ -267,46 +570,138 @@ def run_attack_workflow(
     Returns:
         Dictionary with attack results
     """
-    set_llm_cache(InMemoryCache())ne
+    return asyncio.run(arun_attack_workflow(goal, context_manager, verbose, max_steps))
+
+async def arun_attack_workflow(
+    goal: str,
+    context_manager: Optional[ContextManager] = None,
+    verbose: bool = False,
+    max_steps: Optional[int] = None
+) -> Dict[str, Any]:
+    """
+    Run the attack workflow with the specified goal on the running event loop
+    
+    Args:
+        goal: The attack goal
+        context_manager: Optional ContextManager instance to use
+        verbose: Whether to enable verbose output
+        max_steps: Maximum number of steps to execute
+        
+    Returns:
+        Dictionary with attack results
+    """
+    set_llm_cache(get_llm_cache())
+    
+    internal_context = context_manager is None
     if internal_context:
-        context_manager = ContextManager()
-    context_manager.set_attack_goal(goal)
+        context_manager = ContextManager(load=False)
+    await run_io(context_manager.set_attack_goal, goal)
 
     if max_steps is not None:
-        print(f"[INFO] Using custom max_steps: {max_steps} instead of default: {MAX_ATTACK_STEPS}")
+        logger.info("Using custom max_steps: %s instead of default: %s", max_steps, MAX_ATTACK_STEPS)
 
-    workflow = create_attack_workflow()
-    app = workflow.compile()
+    app = _get_app()
 
     initial_state = {
         "goal": goal,
-        "context": "",
+        "context_chunks": [],
+        "context_tokens": 0,
+        "last_summary_step": None,
         "current_plan": {},
+        "plan_steps": [],
+        "plan_index": 0,
         "current_step": "",
         "step_command": "",
         "step_output": "",
+        "step_commands": [],
+        "step_outputs": [],
+        "step_output_paths": [],
+        "prefetched_step": "",
+        "prefetched_command": "",
         "history": [],
         "vulnerabilities": [],
+        "service_index": {},
         "step_count": 0,
+        "consecutive_errors": 0,
         "goal_reached": False,
         "error": "",
         "max_steps": max_steps
     }
+    
+    # Bound the graph to what the step budget can need, so a loop that makes
+    # no progress is stopped early
+    recursion_limit = (max_steps or MAX_ATTACK_STEPS) * NODES_PER_STEP + NODES_PER_ATTACK
+    result = await app.ainvoke(
         initial_state,
-        config={"recursion_limit": 200}
+        config={"recursion_limit": recursion_limit}
     )
 
+    history = format_history(result.get("history", []))
+    
     if internal_context:
-        for step in result.get("history", []):
+        for step in history:
             context_manager.add_attack_step(step)
-        for vuln in result.get("vulnerabilities", []):
-            context_manager.add_vulnerability(vuln)
+        context_manager.add_vulnerabilities_bulk(result.get("vulnerabilities", []))
+    await run_io(context_manager.flush)
 
     return {
         "goal": result.get("goal"),
         "goal_reached": result.get("goal_reached", False),
         "steps_executed": result.get("step_count", 0),
         "vulnerabilities": result.get("vulnerabilities", []),
-        "history": result.get("history", []),
+        "history": history,
         "error": result.get("error", "")
-    }
\ No newline at end of file
+    }
+
+def run_attacks(
+    goals: List[str],
+    max_concurrency: int = MAX_CONCURRENT_ATTACKS,
+    max_steps: Optional[int] = None
+) -> List[Dict[str, Any]]:
+    """
+    Run several attack workflows concurrently, blocking until all finish
+    
+    Args:
+        goals: The attack goals
+        max_concurrency: Maximum number of attacks running at once
+        max_steps: Maximum number of steps to execute per attack
+        
+    Returns:
+        List with the attack results, in the order of goals
+    """
+    return asyncio.run(arun_attacks(goals, max_concurrency, max_steps))
+
+async def arun_attacks(
+    goals: List[str],
+    max_concurrency: int = MAX_CONCURRENT_ATTACKS,
+    max_steps: Optional[int] = None
+) -> List[Dict[str, Any]]:
+    """
+    Run several attack workflows concurrently on the running event loop. They
+    share the compiled graph, the agents and the pooled SSH connection; each
+    keeps its own context file.
+    
+    Args:
+        goals: The attack goals
+        max_concurrency: Maximum number of attacks running at once
+        max_steps: Maximum number of steps to execute per attack
+        
+    Returns:
+        List with the attack results, in the order of goals
+    """
+    semaphore = asyncio.Semaphore(max(1, max_concurrency))
+    base, ext = os.path.splitext(CONTEXT_FILE_PATH)
+    
+    async def run(index: int, goal: str) -> Dict[str, Any]:
+        async with semaphore:
+            context_manager = ContextManager(f"{base}_{index}{ext}", load=False)
+            try:
+                return await arun_attack_workflow(goal, context_manager, max_steps=max_steps)
+            except Exception as e:
+                print(f"Error running attack '{goal}': {str(e)}")
+                return {"goal": goal, "goal_reached": False, "steps_executed": 0,
+                        "vulnerabilities": [], "history": [], "error": str(e)}
+            finally:
+                await run_io(context_manager.close)
+    
+    return await asyncio.gather(*(run(index, goal) for index, goal in enumerate(goals)))